@@ -1,4 +1,9 @@
+import mmap
+import multiprocessing
 import random
+from array import array
+from bisect import bisect_right
+from collections import deque
 
 class Grammar:
     def __init__(self):
@@ -9,39 +14,189 @@ class Grammar:
             'F': ['cF', 'dF', 'aL', 'b'],
             'L': ['aL', 'c']
         }
+        self.compiled = None
+
+    def compile(self):
+        # Intern symbols and productions once for the analyses below. This is a snapshot: after
+        # changing P, V_n or V_t, call compile() again. Until the first call every analysis
+        # interns the grammar as it is at that moment.
+        self.compiled = CompiledGrammar(self.P, self.V_t, self.V_n)
+        return self.compiled
+
+    def compiled_grammar(self):
+        return self.compiled if self.compiled is not None else CompiledGrammar(self.P, self.V_t, self.V_n)
 
     def generate_string(self, start_symbol='S', max_length=10):
-        if max_length == 0:
-            return ''
-        if start_symbol not in self.V_n:
-            return start_symbol
-        production_choices = self.P[start_symbol]
-        chosen_production = random.choice(production_choices)
-        generated_string = ''
-        for symbol in chosen_production:
-            generated_string += self.generate_string(symbol, max_length - 1)
-        return generated_string
+        compiled = self.compiled_grammar()
+        symbols = compiled.symbols
+        generated = []
+        stack = [(compiled.symbol_ids.get(start_symbol, -1), max_length)]
+        while stack:
+            symbol, depth = stack.pop()
+            if depth == 0:
+                continue
+            if symbol == -1:
+                generated.append(start_symbol)
+            elif not compiled.non_terminal[symbol]:
+                generated.append(symbols[symbol])
+            else:
+                rhs = compiled.rhs[random.choice(compiled.by_lhs[symbol])]
+                stack.extend((next_symbol, depth - 1) for next_symbol in reversed(rhs))
+        return ''.join(generated)
+
+    def right_linear_rules(self):
+        # Split every production into its terminal prefix and optional trailing non-terminal
+        compiled = self.compiled_grammar()
+        symbols = compiled.symbols
+        rules = {}
+        for production in range(len(compiled.rhs)):
+            if compiled.lhs_length[production] != 1:
+                raise ValueError(f"{compiled.render(production)} has more than one symbol on the left")
+            rhs = compiled.rhs[production]
+            nonterminals = compiled.rhs_nonterminals[production]
+            if nonterminals > 1 or (nonterminals == 1 and not compiled.rhs_tail[production]):
+                raise ValueError(f"{compiled.render(production)} is not right-linear")
+            if compiled.rhs_tail[production] and compiled.rhs_length[production] == 1:
+                raise ValueError(f"{compiled.render(production)} is a unit production")
+            if compiled.rhs_tail[production]:
+                prefix, next_symbol = ''.join(symbols[s] for s in rhs[:-1]), symbols[rhs[-1]]
+            else:
+                prefix, next_symbol = ''.join(symbols[s] for s in rhs), None
+            rules.setdefault(symbols[compiled.lhs[production][0]], []).append((prefix, next_symbol))
+        return rules
+
+    def derivation_counts(self, max_length, rules=None):
+        # counts[A][n] = number of derivations of a sentence of length n starting from A
+        if rules is None:
+            rules = self.right_linear_rules()
+        counts = {non_terminal: [0] * (max_length + 1) for non_terminal in rules}
+        for n in range(max_length + 1):
+            for non_terminal, productions in rules.items():
+                total = 0
+                for prefix, next_symbol in productions:
+                    rest = n - len(prefix)
+                    if rest < 0:
+                        continue
+                    if next_symbol is None:
+                        total += rest == 0
+                    else:
+                        total += counts[next_symbol][rest]
+                counts[non_terminal][n] = total
+        return counts
+
+    def generate_strings(self, min_length, max_length=None, start_symbol='S'):
+        # Endless stream of sentences with min_length <= len <= max_length, uniform over derivations
+        if max_length is None:
+            max_length = min_length
+        rules = self.right_linear_rules()
+        counts = self.derivation_counts(max_length, rules)
+
+        # choices[A, n] = cumulative weights and (prefix, next symbol, remaining length) options
+        choices = {}
+        for non_terminal, productions in rules.items():
+            for n in range(max_length + 1):
+                cumulative = []
+                options = []
+                total = 0
+                for prefix, next_symbol in productions:
+                    rest = n - len(prefix)
+                    if rest < 0:
+                        continue
+                    weight = (rest == 0) if next_symbol is None else counts[next_symbol][rest]
+                    if weight:
+                        total += weight
+                        cumulative.append(total)
+                        options.append((prefix, next_symbol, rest))
+                if options:
+                    choices[non_terminal, n] = (cumulative, options)
+
+        lengths = []
+        length_cumulative = []
+        total = 0
+        for n in range(min_length, max_length + 1):
+            if counts[start_symbol][n]:
+                total += counts[start_symbol][n]
+                lengths.append(n)
+                length_cumulative.append(total)
+        if not total:
+            raise ValueError(f"No sentences with length between {min_length} and {max_length}")
+
+        randrange = random.randrange
+        while True:
+            n = lengths[bisect_right(length_cumulative, randrange(total))]
+            symbol = start_symbol
+            parts = []
+            while symbol is not None:
+                cumulative, options = choices[symbol, n]
+                if len(options) == 1:
+                    prefix, symbol, n = options[0]
+                else:
+                    prefix, symbol, n = options[bisect_right(cumulative, randrange(cumulative[-1]))]
+                parts.append(prefix)
+            yield ''.join(parts)
 
     def to_finite_automaton(self):
+        compiled = self.compiled_grammar()
+        symbols = compiled.symbols
         states = self.V_n.union(self.V_t)
         alphabet = self.V_t
         transitions = {}
-        for non_terminal, productions in self.P.items():
-            for production in productions:
-                if len(production) == 2:
-                    if (non_terminal, production[0]) in transitions:
-                        transitions[(non_terminal, production[0])].append(production[1])
-                    else:
-                        transitions[(non_terminal, production[0])] = [production[1]]
-                elif len(production) == 1:
-                    if (non_terminal, production) in transitions:
-                        transitions[(non_terminal, production)].append(non_terminal)
-                    else:
-                        transitions[(non_terminal, production)] = [non_terminal]
+        for production, rhs in enumerate(compiled.rhs):
+            non_terminal = ''.join(symbols[symbol] for symbol in compiled.lhs[production])
+            if len(rhs) == 2:
+                transitions.setdefault((non_terminal, symbols[rhs[0]]), []).append(symbols[rhs[1]])
+            elif len(rhs) == 1:
+                transitions.setdefault((non_terminal, symbols[rhs[0]]), []).append(non_terminal)
         initial_state = 'S'
-        accepting_states = {'S', 'F', 'L'}  # Assuming all non-terminals are accepting states
+        accepting_states = set(self.V_n)  # Assuming all non-terminals are accepting states
         return FiniteAutomaton(states, alphabet, transitions, initial_state, accepting_states)
 
+    def enumerate_language(self, max_len):
+        # Every distinct accepted string of length <= max_len in shortlex order, one at a time
+        compiled = self.to_finite_automaton().compile()
+        table = compiled.table
+        symbols = compiled.symbols  # sorted, so depth-first order below is lexicographic
+        width = len(symbols)
+
+        # live[k] = bitmask of DFA states that reach an accepting state in exactly k symbols
+        live = [sum(1 << state for state, accepting in enumerate(compiled.accepting) if accepting)]
+        for _ in range(max_len):
+            previous = live[-1]
+            mask = 0
+            for state, row in enumerate(table):
+                if any(previous >> row[i] & 1 for i in range(width)):
+                    mask |= 1 << state
+            live.append(mask)
+
+        # One pruned depth-first walk per length: only the current path is kept in memory
+        for length in range(max_len + 1):
+            if not live[length] >> compiled.start & 1:
+                continue
+            states = [compiled.start]
+            next_symbol = [0]
+            path = []
+            while states:
+                depth = len(path)
+                if depth == length:
+                    yield ''.join(path)
+                    i = width
+                else:
+                    row = table[states[-1]]
+                    remaining = live[length - depth - 1]
+                    i = next_symbol[-1]
+                    while i < width and not remaining >> row[i] & 1:
+                        i += 1
+                if i == width:
+                    states.pop()
+                    next_symbol.pop()
+                    if path:
+                        path.pop()
+                    continue
+                next_symbol[-1] = i + 1
+                states.append(row[i])
+                next_symbol.append(0)
+                path.append(symbols[i])
+
     def transform_grammar(self):
         productions = []
 
@@ -50,43 +205,33 @@ class Grammar:
                 productions.append(f"{non_terminal} -> {production}")
         return productions
 
-    def classify_grammar(self, terminals, non_terminals):
-        # Check if the grammar is regular
-        productions = self.transform_grammar()
+    def classify_grammar(self, terminals=None, non_terminals=None):
+        if terminals is None and non_terminals is None:
+            compiled = self.compiled_grammar()
+        else:  # the caller's symbol sets are only used for this call
+            compiled = CompiledGrammar(self.P, self.V_t if terminals is None else terminals,
+                                       self.V_n if non_terminals is None else non_terminals)
         is_regular = True
-        for production in productions:
-            left, right = production.split(" -> ")
-            left = left.strip()
-            right = right.strip()
-            if len(right) > 2:
-                is_regular = False
-                break
-            if len(right) == 2 and right[0] not in non_terminals:
-                is_regular = False
-                break
-
-        # Check if the grammar is context-free
         is_context_free = True
-        for production in productions:
-            left, right = production.split(" -> ")
-            left = left.strip()
-            right = right.strip()
-            if len(left) != 1:
-                is_context_free = False
-                break
-
-        # Check if the grammar is context-sensitive
         is_context_sensitive = True
-        for production in productions:
-            left, right = production.split(" -> ")
-            left = left.strip()
-            right = right.strip()
-            if len(left) > len(right):
+        non_terminal = compiled.non_terminal
+        # One pass over the production indexes decides all three levels of the hierarchy
+        for production in range(len(compiled.rhs)):
+            lhs_length = compiled.lhs_length[production]
+            rhs_length = compiled.rhs_length[production]
+            if lhs_length != 1 or not non_terminal[compiled.lhs[production][0]]:
+                is_context_free = False
+            if lhs_length > rhs_length:
                 is_context_sensitive = False
+            # Regular: A -> a or A -> aB
+            if rhs_length > 2 or compiled.rhs_nonterminals[production] > (rhs_length == 2) \
+                    or (rhs_length == 2 and not compiled.rhs_tail[production]):
+                is_regular = False
+            if not is_context_sensitive and not is_context_free:
                 break
 
         # Determine the type of grammar
-        if is_regular:
+        if is_regular and is_context_free:
             return "Regular Grammar"
         elif is_context_free:
             return "Context-Free Grammar"
@@ -95,6 +240,71 @@ class Grammar:
         else:
             return "Unrestricted Grammar"
 
+
+class CompiledGrammar:
+    # Grammar with interned symbols: productions are tuples of symbol ids plus per-production indexes
+    def __init__(self, productions, terminals, non_terminals):
+        self.symbols = []
+        self.symbol_ids = {}
+        self.non_terminal = bytearray()
+        for symbol in sorted(non_terminals):
+            self.intern(symbol, True)
+        for symbol in sorted(terminals):
+            self.intern(symbol, False)
+        self.symbol_lengths = sorted({len(symbol) for symbol in self.symbols}, reverse=True)
+
+        self.lhs = []
+        self.rhs = []
+        self.lhs_length = array('i')
+        self.rhs_length = array('i')
+        self.rhs_nonterminals = array('i')  # how many non-terminals the right side contains
+        self.rhs_tail = bytearray()  # 1 when the right side ends with a non-terminal
+        self.by_lhs = {}  # left-side symbol id -> production indexes (single-symbol left sides)
+        for left, right_sides in productions.items():
+            lhs = self.split(left)
+            for right in right_sides:
+                rhs = self.split(right)
+                production = len(self.rhs)
+                self.lhs.append(lhs)
+                self.rhs.append(rhs)
+                self.lhs_length.append(len(lhs))
+                self.rhs_length.append(len(rhs))
+                self.rhs_nonterminals.append(sum(self.non_terminal[symbol] for symbol in rhs))
+                self.rhs_tail.append(bool(rhs) and self.non_terminal[rhs[-1]])
+                if len(lhs) == 1:
+                    self.by_lhs.setdefault(lhs[0], []).append(production)
+
+    def intern(self, symbol, non_terminal=False):
+        if symbol not in self.symbol_ids:
+            self.symbol_ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            self.non_terminal.append(non_terminal)
+        return self.symbol_ids[symbol]
+
+    def split(self, text):
+        # Longest-match split into known symbols; unknown characters become terminals
+        if not isinstance(text, str):
+            return tuple(self.intern(symbol) for symbol in text)
+        symbol_ids = self.symbol_ids
+        ids = []
+        i = 0
+        while i < len(text):
+            for length in self.symbol_lengths:
+                symbol = symbol_ids.get(text[i:i + length])
+                if symbol is not None:
+                    break
+            else:
+                symbol, length = self.intern(text[i]), 1
+            ids.append(symbol)
+            i += length
+        return tuple(ids)
+
+    def render(self, production):
+        lhs = ''.join(self.symbols[symbol] for symbol in self.lhs[production])
+        rhs = ''.join(self.symbols[symbol] for symbol in self.rhs[production])
+        return f"{lhs} -> {rhs}"
+
+
 class FiniteAutomaton:
     def __init__(self, states, alphabet, transitions, initial_state, accepting_states):
         self.states = states
@@ -103,36 +313,361 @@ class FiniteAutomaton:
         self.initial_state = initial_state
         self.accepting_states = accepting_states
 
+        self.compiled = None
+        self.search_automaton = None
+
+    def compile(self):
+        # Subset construction done once for the methods below. This is a snapshot: after changing
+        # transitions, alphabet or accepting_states, call compile() again. Until the first call
+        # every method works on the automaton as it is at that moment.
+        self.compiled = self.determinize()
+        return self.compiled
+
+    def compiled_automaton(self):
+        return self.compiled if self.compiled is not None else self.determinize()
+
+    def determinize(self):
+        # Every reachable set of NFA states becomes one integer DFA state
+        symbols = sorted(self.alphabet)
+        symbol_ids = {symbol: i for i, symbol in enumerate(symbols)}
+        unknown = len(symbols)  # extra column for symbols outside the alphabet
+        dead = frozenset()
+        start = frozenset([self.initial_state])
+        state_ids = {dead: 0, start: 1}
+        subsets = [dead, start]
+        table = []
+        i = 0
+        while i < len(subsets):
+            row = []
+            for symbol in symbols:
+                target = frozenset(next_state for state in subsets[i]
+                                   for next_state in self.transitions.get((state, symbol), ()))
+                if target not in state_ids:
+                    state_ids[target] = len(subsets)
+                    subsets.append(target)
+                row.append(state_ids[target])
+            row.append(0)
+            table.append(tuple(row))
+            i += 1
+        accepting = tuple(any(state in self.accepting_states for state in subset) for subset in subsets)
+        return CompiledAutomaton(symbols, symbol_ids, unknown, table, state_ids[start], accepting)
+
     def string_belongs_to_language(self, input_string):
+        if self.compiled is not None:
+            return self.compiled.accepts(input_string)
+        # Not compiled: one string is cheaper to simulate on the NFA than to determinize for
         current_states = {self.initial_state}
         for symbol in input_string:
             next_states = set()
             for state in current_states:
-                if (state, symbol) in self.transitions:
-                    next_states.update(self.transitions[(state, symbol)])
+                next_states.update(self.transitions.get((state, symbol), ()))
             current_states = next_states
         return any(state in self.accepting_states for state in current_states)
 
-# Test Grammar functionality
-grammar = Grammar()
+    def accepts_many(self, strings):
+        return self.compiled_automaton().accepts_many(strings)
+
+    def search(self, source, overlapping=False, chunk_size=1 << 16):
+        # (start, end) spans of the text that belong to the language, leftmost-longest by default
+        compiled = self.compiled_automaton()
+        if self.search_automaton is None or self.search_automaton.compiled is not compiled:
+            self.search_automaton = SearchAutomaton(compiled)
+        return self.search_automaton.search(source, overlapping, chunk_size)
 
-# Generate 5 valid strings from the grammar
-print("Generated strings:")
-for _ in range(5):
-    generated_string = grammar.generate_string()
-    print(generated_string)
+    def validate_file(self, path, workers=None, chunk_size=1 << 24):
+        # Yields True/False for every line of the file, in order, checked on all cores
+        for verdicts in self._map_file(path, workers, chunk_size, False):
+            yield from map(bool, verdicts)
 
-# Convert Grammar to Finite Automaton
-finite_automaton = grammar.to_finite_automaton()
+    def count_file(self, path, workers=None, chunk_size=1 << 24):
+        # (accepted, rejected) line counts for the whole file
+        accepted = rejected = 0
+        for chunk_accepted, chunk_rejected in self._map_file(path, workers, chunk_size, True):
+            accepted += chunk_accepted
+            rejected += chunk_rejected
+        return accepted, rejected
 
-# Test strings with the Finite Automaton
-test_strings = ['abcc', 'bdab', 'cddd', 'abcb', 'bbaac']
-for string in test_strings:
-    if finite_automaton.string_belongs_to_language(string):
-        print(f"'{string}' belongs to the language.")
+    def _map_file(self, path, workers, chunk_size, counts):
+        compiled = self.compiled_automaton()
+        tasks = [(path, start, end, counts) for start, end in file_chunks(path, chunk_size)]
+        if workers == 1 or len(tasks) <= 1:
+            init_worker(compiled)
+            yield from map(check_chunk, tasks)
+            return
+        # The compiled automaton is pickled once per worker, not once per chunk
+        with multiprocessing.Pool(workers, initializer=init_worker, initargs=(compiled,)) as pool:
+            yield from pool.imap(check_chunk, tasks)
+
+
+def file_chunks(path, chunk_size):
+    # (start, end) byte ranges of about chunk_size bytes, each ending right after a newline
+    with open(path, 'rb') as file:
+        size = file.seek(0, 2)
+        if size == 0:
+            return []
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            chunks = []
+            start = 0
+            while start < size:
+                end = data.find(b'\n', min(start + chunk_size, size) - 1)
+                end = size if end == -1 else end + 1
+                chunks.append((start, end))
+                start = end
+            return chunks
+
+
+worker_automaton = None
+
+
+def init_worker(compiled):
+    global worker_automaton
+    worker_automaton = compiled
+
+
+def check_chunk(task):
+    path, start, end, counts = task
+    accepts = worker_automaton.accepts
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        lines = data[start:end].decode('utf-8').split('\n')
+    if lines[-1] == '':
+        lines.pop()  # the chunk ends with a newline
+    verdicts = bytearray(accepts(line[:-1] if line.endswith('\r') else line) for line in lines)
+    if counts:
+        accepted = verdicts.count(1)
+        return accepted, len(verdicts) - accepted
+    return verdicts
+
+
+def read_chunks(source, chunk_size):
+    # Text pieces from a str, a file object or a bytes-like object such as an mmap
+    if isinstance(source, str):
+        yield source
+    elif isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        # latin-1 keeps one character per byte, so positions are byte offsets
+        for offset in range(0, len(source), chunk_size):
+            yield bytes(source[offset:offset + chunk_size]).decode('latin-1')
     else:
-        print(f"'{string}' does not belong to the language.")
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk.decode('latin-1') if isinstance(chunk, bytes) else chunk
+
+
+class SearchAutomaton:
+    # Unanchored DFA built lazily over a CompiledAutomaton. A search state is the tuple of live
+    # compiled states; the compiled start state is re-entered at every position (self-loop on start).
+    # Every slot of a search state carries a group of match starts, so one pass finds all of them.
+    def __init__(self, compiled):
+        self.compiled = compiled
+        self.width = compiled.unknown + 1
+        self.states = [()]
+        self.state_ids = {(): 0}
+        self.rows = [[None] * self.width]
+        self.accept_slots = [()]
+
+    def transition(self, state_id, code):
+        table = self.compiled.table
+        states = self.states[state_id]
+        targets = {}
+        for slot, state in enumerate(states):
+            target = table[state][code]
+            if target:
+                targets.setdefault(target, []).append(slot)
+        target = table[self.compiled.start][code]
+        if target:
+            targets.setdefault(target, []).append(-1)  # -1 is the thread started at this position
+        next_states = tuple(sorted(targets))
+        if next_states not in self.state_ids:
+            self.state_ids[next_states] = len(self.states)
+            self.states.append(next_states)
+            self.rows.append([None] * self.width)
+            self.accept_slots.append(tuple(slot for slot, state in enumerate(next_states)
+                                           if self.compiled.accepting[state]))
+        sources = tuple(tuple(targets[state]) for state in next_states)
+        kept = {slot for source in sources for slot in source}
+        dropped = tuple(slot for slot in range(len(states)) if slot not in kept)
+        entry = (self.state_ids[next_states], sources, dropped, -1 not in kept)
+        self.rows[state_id][code] = entry
+        return entry
+
+    def search(self, source, overlapping=False, chunk_size=1 << 16):
+        compiled = self.compiled
+        symbol_ids = compiled.symbol_ids
+        unknown = compiled.unknown
+        start_accepting = compiled.accepting[compiled.start]
+        rows = self.rows
+        accept_slots = self.accept_slots
+
+        # member = [start, end, join position, alive]; group = [members, last accepting end]
+        groups = []
+        pending = deque()  # members in start order, reported once they are dead
+        next_allowed = 0
+        state_id = 0
+        pos = 0
+        for chunk in read_chunks(source, chunk_size):
+            for symbol in chunk:
+                code = symbol_ids.get(symbol, unknown)
+                entry = rows[state_id][code]
+                if entry is None:
+                    entry = self.transition(state_id, code)
+                next_id, sources, dropped, start_dropped = entry
+                if not (state_id or next_id or start_accepting):
+                    pos += 1  # idle: no live threads and the start thread dies at once
+                    continue
+
+                member = None
+                if start_accepting or not start_dropped:
+                    member = [pos, pos if start_accepting else None, pos, True]
+                    pending.append(member)
+                next_groups = []
+                for slots in sources:
+                    merged = [groups[slot] if slot >= 0 else [[member], None] for slot in slots]
+                    group = max(merged, key=lambda g: len(g[0]))
+                    for other in merged:
+                        if other is not group:
+                            # Smaller group joins the larger one; flush its pending accept first
+                            end = other[1]
+                            for joined in other[0]:
+                                if end is not None and end > joined[2]:
+                                    joined[1] = end
+                                joined[2] = pos
+                                group[0].append(joined)
+                    next_groups.append(group)
+                for slot in dropped:
+                    finish_group(groups[slot])
+                if member is not None and start_dropped:
+                    member[3] = False
+                groups = next_groups
+                pos += 1
+                for slot in accept_slots[next_id]:
+                    groups[slot][1] = pos
+                state_id = next_id
+
+                while pending and not pending[0][3]:
+                    start, end, _, _ = pending.popleft()
+                    if end is None:
+                        continue
+                    if overlapping:
+                        yield start, end
+                    elif start >= next_allowed:
+                        yield start, end
+                        next_allowed = end if end > start else start + 1
+
+        for group in groups:
+            finish_group(group)
+        if start_accepting:
+            pending.append([pos, pos, pos, False])
+        for start, end, _, _ in pending:
+            if end is None:
+                continue
+            if overlapping:
+                yield start, end
+            elif start >= next_allowed:
+                yield start, end
+                next_allowed = end if end > start else start + 1
+
+
+def finish_group(group):
+    members, end = group
+    for member in members:
+        if end is not None and end > member[2]:
+            member[1] = end
+        member[3] = False
+
+
+class CompiledAutomaton:
+    # Dense DFA: states and symbols are small ints, state 0 is the dead state
+    def __init__(self, symbols, symbol_ids, unknown, table, start, accepting):
+        self.symbols = symbols
+        self.symbol_ids = symbol_ids
+        self.unknown = unknown
+        self.table = table
+        self.start = start
+        self.accepting = accepting
+        self.batch_tables = None  # numpy tables for accepts_many, built by its first call
+
+    def accepts(self, input_string):
+        table = self.table
+        symbol_ids = self.symbol_ids
+        unknown = self.unknown
+        state = self.start
+        for symbol in input_string:
+            state = table[state][symbol_ids.get(symbol, unknown)]
+            if not state:
+                return False
+        return self.accepting[state]
+
+    def accepts_many(self, strings):
+        # Batch membership: all strings advance through the table together, one column per step
+        import numpy as np  # only the batch path needs numpy
+
+        strings = list(strings)
+        if not strings:
+            return np.zeros(0, dtype=bool)
+        pad = self.unknown + 1  # padding column keeps every state where it is
+        if self.batch_tables is None:
+            table = np.array(self.table, dtype=np.int32)
+            table = np.hstack([table, np.arange(len(table), dtype=np.int32)[:, None]])
+            # A symbol of several characters never matches one character, so only single ones get a code
+            chars = sorted((ord(symbol), code) for symbol, code in self.symbol_ids.items() if len(symbol) == 1)
+            byte_codes = bytearray([self.unknown]) * 256
+            for char, code in chars:
+                if char < 256:
+                    byte_codes[char] = code
+            symbol_chars = np.array([char for char, _ in chars] or [-1], dtype=np.int64)
+            symbol_codes = np.array([code for _, code in chars] or [self.unknown], dtype=np.int32)
+            self.batch_tables = (table, np.array(self.accepting, dtype=bool), bytes(byte_codes), symbol_chars,
+                                 symbol_codes)
+        table, accepting, byte_codes, symbol_chars, symbol_codes = self.batch_tables
+
+        lengths = np.fromiter(map(len, strings), dtype=np.int64, count=len(strings))
+        text = ''.join(strings)
+        data = None
+        if pad < 256:
+            try:
+                data = text.encode('latin-1')
+            except UnicodeEncodeError:
+                pass
+        if data is not None:
+            # Fast path: one bytes.translate call turns the whole batch into symbol codes
+            codes = np.frombuffer(data.translate(byte_codes), dtype=np.uint8)
+        else:
+            chars = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+            positions = np.minimum(np.searchsorted(symbol_chars, chars), len(symbol_chars) - 1)
+            codes = np.where(symbol_chars[positions] == chars, symbol_codes[positions], self.unknown)
+
+        # Column-major code matrix so each step reads one contiguous row
+        width = int(lengths.max())
+        matrix = np.full((width, len(strings)), pad, dtype=np.int32)
+        matrix.T[np.arange(width) < lengths[:, None]] = codes
+
+        states = np.full(len(strings), self.start, dtype=np.int32)
+        for column in matrix:
+            states = table[states, column]
+        return accepting[states]
+
+if __name__ == "__main__":
+    # Test Grammar functionality
+    grammar = Grammar()
+
+    # Generate 5 valid strings from the grammar
+    print("Generated strings:")
+    for _ in range(5):
+        generated_string = grammar.generate_string()
+        print(generated_string)
+
+    # Convert Grammar to Finite Automaton
+    finite_automaton = grammar.to_finite_automaton()
+
+    # Test strings with the Finite Automaton
+    test_strings = ['abcc', 'bdab', 'cddd', 'abcb', 'bbaac']
+    for string in test_strings:
+        if finite_automaton.string_belongs_to_language(string):
+            print(f"'{string}' belongs to the language.")
+        else:
+            print(f"'{string}' does not belong to the language.")
 
-# Classify the grammar based on Chomsky hierarchy
-gram_classification = grammar.classify_grammar(grammar.V_t, grammar.V_n)
-print("Grammar Classification:", gram_classification)
\ No newline at end of file
+    # Classify the grammar based on Chomsky hierarchy
+    gram_classification = grammar.classify_grammar(grammar.V_t, grammar.V_n)
+    print("Grammar Classification:", gram_classification)
@@ -1,97 +1,788 @@
-from automathon import DFA, NFA
+import mmap
+import struct
+import sys
+from array import array
+from collections import deque
 
 class FiniteAutomaton:
-    def __init__(self):
-        self.Q = ['q0', 'q1', 'q2', 'q3']
-        self.Sigma = ['a', 'b']
+    def __init__(self, Q=None, Sigma=None, Delta=None, q0=None, F=None):
+        # Without arguments this is the automaton of the lab variant
+        self.Q = ['q0', 'q1', 'q2', 'q3'] if Q is None else Q
+        self.Sigma = ['a', 'b'] if Sigma is None else Sigma
         self.Delta = {
             ('q0', 'a'): ['q1'],
             ('q0', 'b'): ['q0'],
             ('q1', 'a'): ['q2', 'q3'],
             ('q2', 'a'): ['q3'],
             ('q2', 'b'): ['q0'],
-        }
-        self.q0 = 'q0'
-        self.F = ['q3']
+        } if Delta is None else Delta
+        self.q0 = 'q0' if q0 is None else q0
+        self.F = ['q3'] if F is None else F
+        self.compiled = None
+        self.searcher = None  # (compiled tables, SearchAutomaton over them)
 
     def convert_to_grammar(self):
         S = self.Q[0]
         V_n = self.Q
         V_t = self.Sigma
-        P = [(state, symbol, next_state) for state in self.Q for symbol in self.Sigma
+        # Epsilon moves (symbol '') become unit productions
+        P = [(state, symbol, next_state) for state in self.Q for symbol in self.Sigma + ['']
              for next_state in self.Delta.get((state, symbol), [])]
         for final_state in self.F:
             P.append((final_state, '', 'e'))
         return Grammar(S, V_n, V_t, P)
 
     def check_deterministic(self):
-        return all(len(value) <= 1 for value in self.Delta.values())
-
-    def nfa_to_dfa(self):
-        input_symbols = self.Sigma
-        initial_state = self.q0
-        states = []
-        final_states = set()  # Using a set to collect unique final states
-
-        transitions = {}
-        new_states = ['q0']
-        while new_states:
-            for state in new_states:
-                new_states.remove(state)
-                if state not in transitions.keys():
-                    transitions[state] = {}
-                    temp_state = state.split(',')
-                    for el in input_symbols:
-                        transitions[state].update({el: ''})
-                        for s in temp_state:
-                            if (s, el) in self.Delta.keys():
-                                transitions[state][el] += ','.join(self.Delta[(s, el)]) + ','
-                                if len(','.join(transitions[state][el])) >= len(','.join(state)):
-                                    new_states.append(transitions[state][el].rstrip(','))
-                        transitions[state][el] = transitions[state][el].rstrip(',')
-                    # Remove empty strings from the secondary dictionaries
-                    transitions[state] = {key: value for key, value in transitions[state].items() if value != ''}
-
-        for key, _ in transitions.items():
-            states.append(key)
-
-        # Function to perform epsilon closure
-        def epsilon_closure(state):
-            closure = {state}
-            stack = [state]
-            while stack:
-                current_state = stack.pop()
-                if current_state in self.Delta and ('', '') in self.Delta[current_state]:
-                    for next_state in self.Delta[current_state][('', '')]:
-                        if next_state not in closure:
-                            closure.add(next_state)
-                            stack.append(next_state)
-            return closure
-
-        # Identify final states reachable from initial final states via epsilon transitions
-        for el in self.F:
-            for state in epsilon_closure(el):
-                final_states.add(state)
-
-        # Check if any state contains 'q3'
-        for state in states:
-            if 'q3' in state:
-                final_states.add(state)
-
-        print(f"Q = {states}")
-        print(f"Sigma = {input_symbols}")
-        print(f"Delta = {transitions}")
-        print(f"q0 = {initial_state}")
-        print(f"F = {list(final_states)}")  # Convert set to list
+        return all(len(value) <= 1 and symbol != '' for (_, symbol), value in self.Delta.items())
+
+    def search(self, source, overlapping=False, chunk_size=1 << 16):
+        # (start, end) spans of the text that belong to the language, leftmost-longest by default,
+        # found in one pass of the search automaton over the minimal DFA. The search automaton is
+        # kept for as long as the compile() snapshot it was built from.
+        if self.compiled is None:
+            return SearchAutomaton(self.nfa_to_dfa(minimal=True)).search(source, overlapping, chunk_size)
+        if self.searcher is None or self.searcher[0] is not self.compiled:
+            self.searcher = (self.compiled, SearchAutomaton(self.nfa_to_dfa(minimal=True)))
+        return self.searcher[1].search(source, overlapping, chunk_size)
+
+    def epsilon_closures(self):
+        # Epsilon moves are Delta[(state, '')]. Closures are computed once for all states: Tarjan SCCs of
+        # the epsilon graph come out sinks first, so each component ORs in its successors' finished closures
+        index = {state: i for i, state in enumerate(self.Q)}
+        edges = [[] for _ in self.Q]
+        for (state, symbol), targets in self.Delta.items():
+            if symbol == '':
+                edges[index[state]].extend(index[target] for target in targets)
+
+        component_of = [-1] * len(self.Q)
+        closures = []  # closure bitmask per component
+        order = [-1] * len(self.Q)
+        low = [0] * len(self.Q)
+        stack = []
+        counter = 0
+        for root in range(len(self.Q)):
+            if order[root] != -1:
+                continue
+            work = [(root, 0)]
+            while work:
+                node, edge = work.pop()
+                if edge == 0:
+                    order[node] = low[node] = counter
+                    counter += 1
+                    stack.append(node)
+                if edge < len(edges[node]):
+                    work.append((node, edge + 1))
+                    target = edges[node][edge]
+                    if order[target] == -1:
+                        work.append((target, 0))
+                    elif component_of[target] == -1:
+                        low[node] = min(low[node], order[target])
+                    continue
+                if low[node] == order[node]:
+                    members = []
+                    while True:
+                        member = stack.pop()
+                        component_of[member] = len(closures)
+                        members.append(member)
+                        if member == node:
+                            break
+                    mask = 0
+                    for member in members:
+                        mask |= 1 << member
+                        for target in edges[member]:
+                            if component_of[target] != len(closures):
+                                mask |= closures[component_of[target]]
+                    closures.append(mask)
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+        return [closures[component_of[i]] for i in range(len(self.Q))]
+
+    def compile(self):
+        # Bitmask tables built once for the methods below. This is a snapshot: after changing Q,
+        # Delta, q0 or F, call compile() again. Until the first call every method builds the tables
+        # from the automaton as it is at that moment.
+        self.compiled = self.build_nfa_tables()
+        return self.compiled
+
+    def nfa_tables(self):
+        return self.compiled if self.compiled is not None else self.build_nfa_tables()
+
+    def build_nfa_tables(self):
+        # Bitmask tables shared by determinization and simulation
+        bits = {state: 1 << i for i, state in enumerate(self.Q)}
+        closures = self.epsilon_closures()
+        moves = [{} for _ in self.Q]  # moves[i][symbol] = closed bitmask of targets of the i-th NFA state
+        for (state, symbol), targets in self.Delta.items():
+            if symbol == '':
+                continue
+            row = moves[bits[state].bit_length() - 1]
+            for target in targets:
+                row[symbol] = row.get(symbol, 0) | closures[bits[target].bit_length() - 1]
+        final_mask = 0
+        for state in self.F:
+            final_mask |= bits[state]
+        start_mask = closures[bits[self.q0].bit_length() - 1]
+        return moves, start_mask, final_mask
+
+    def accepts(self, input_string):
+        moves, current, final_mask = self.nfa_tables()
+        for symbol in input_string:
+            current = move(moves, current, symbol)
+        return bool(current & final_mask)
+
+    def is_empty(self):
+        # Plain reachability over NFA states, stopping at the first final state
+        finals = set(self.F)
+        seen = {self.q0}
+        stack = [self.q0]
+        while stack:
+            state = stack.pop()
+            if state in finals:
+                return False
+            for symbol in self.Sigma + ['']:
+                for target in self.Delta.get((state, symbol), []):
+                    if target not in seen:
+                        seen.add(target)
+                        stack.append(target)
+        return True
+
+    def intersection(self, other):
+        return build_product(self, other, 'intersection')
+
+    def union(self, other):
+        return build_product(self, other, 'union')
+
+    def difference(self, other):
+        return build_product(self, other, 'difference')
+
+    def complement(self):
+        # Complement with respect to Sigma: everything minus this language
+        universe = FiniteAutomaton(['u'], list(self.Sigma), {('u', symbol): ['u'] for symbol in self.Sigma},
+                                   'u', ['u'])
+        return build_product(universe, self, 'difference')
+
+    def intersects(self, other):
+        return any(accepting for _, accepting, _ in product_states(self, other, 'intersection'))
+
+    def is_subset(self, other):
+        return not any(accepting for _, accepting, _ in product_states(self, other, 'difference'))
+
+    def lazy_dfa(self, cache_size=1024):
+        return LazyDFA(self, cache_size)
+
+    def bit_parallel(self, max_states=64):
+        return BitParallelNFA(self, max_states)
+
+    def determinize(self):
+        # Worklist subset construction: NFA states are bit positions, DFA states are int bitmasks
+        moves, start_mask, final_mask = self.nfa_tables()
+        masks = [start_mask]
+        ids = {masks[0]: 0}
+        transitions = []
+        i = 0
+        while i < len(masks):
+            row = {}
+            remaining = masks[i]
+            while remaining:
+                low = remaining & -remaining
+                remaining ^= low
+                for symbol, target in moves[low.bit_length() - 1].items():
+                    row[symbol] = row.get(symbol, 0) | target
+            for symbol, target in row.items():
+                if target not in ids:
+                    ids[target] = len(masks)
+                    masks.append(target)
+                row[symbol] = ids[target]
+            transitions.append(row)
+            i += 1
+        accepting = [bool(mask & final_mask) for mask in masks]
+        return masks, transitions, accepting
+
+    def minimize(self):
+        # Hopcroft partition refinement over the determinized automaton, renumbered canonically
+        _, transitions, accepting = self.determinize()
+        symbols = sorted({symbol for row in transitions for symbol in row})
+        dead = len(transitions)  # missing transitions go to an explicit dead state
+        inverse = {symbol: [[] for _ in range(dead + 1)] for symbol in symbols}
+        for state in range(dead + 1):
+            row = transitions[state] if state < dead else {}
+            for symbol in symbols:
+                inverse[symbol][row.get(symbol, dead)].append(state)
+
+        finals = {state for state in range(dead) if accepting[state]}
+        others = set(range(dead + 1)) - finals
+        blocks = [block for block in (finals, others) if block]
+        block_of = [0] * (dead + 1)
+        for index, block in enumerate(blocks):
+            for state in block:
+                block_of[state] = index
+        smaller = min(range(len(blocks)), key=lambda index: len(blocks[index]))
+        waiting = {(smaller, symbol) for symbol in symbols}
+        while waiting:
+            splitter, symbol = waiting.pop()
+            predecessors = {source for target in blocks[splitter] for source in inverse[symbol][target]}
+            touched = {}
+            for state in predecessors:
+                touched.setdefault(block_of[state], set()).add(state)
+            for index, inside in touched.items():
+                block = blocks[index]
+                if len(inside) == len(block):
+                    continue
+                block -= inside
+                new_index = len(blocks)
+                blocks.append(inside)
+                for state in inside:
+                    block_of[state] = new_index
+                for other_symbol in symbols:
+                    if (index, other_symbol) in waiting:
+                        waiting.add((new_index, other_symbol))
+                    else:
+                        waiting.add((new_index if len(inside) <= len(block) else index, other_symbol))
+
+        # Canonical numbering: breadth-first from the start block, symbols in sorted order
+        dead_block = block_of[dead]
+        numbering = {block_of[0]: 0}
+        order = [block_of[0]]
+        minimal = []
+        for block in order:
+            state = next(iter(blocks[block]))
+            row = {}
+            for symbol in symbols:
+                target = block_of[transitions[state].get(symbol, dead) if state < dead else dead]
+                if target == dead_block:
+                    continue
+                if target not in numbering:
+                    numbering[target] = len(order)
+                    order.append(target)
+                row[symbol] = numbering[target]
+            minimal.append(row)
+        minimal_accepting = [any(state < dead and accepting[state] for state in blocks[block]) for block in order]
+        return minimal, minimal_accepting
+
+    def is_equivalent(self, other):
+        return self.minimize() == other.minimize()
+
+    def state_name(self, mask):
+        return ','.join(state for i, state in enumerate(self.Q) if mask >> i & 1)
+
+    def nfa_to_dfa(self, minimal=False):
+        # Returns a DenseDFA; printing and Graphviz rendering are left to the caller (show, render)
+        if minimal:
+            transitions, accepting = self.minimize()
+            names = [f'd{state}' for state in range(len(transitions))]
+        else:
+            masks, transitions, accepting = self.determinize()
+            names = [self.state_name(mask) for mask in masks]
+        symbols = sorted(self.Sigma)
+        symbol_ids = {symbol: i for i, symbol in enumerate(symbols)}
+        table = array('i', [-1]) * (len(transitions) * len(symbols))
+        for state, row in enumerate(transitions):
+            for symbol, target in row.items():
+                table[state * len(symbols) + symbol_ids[symbol]] = target
+        accept_bitmap = bytearray((len(transitions) + 7) // 8)
+        for state, is_final in enumerate(accepting):
+            if is_final:
+                accept_bitmap[state >> 3] |= 1 << (state & 7)
+        return DenseDFA(symbols, len(transitions), table, accept_bitmap, names)
+
+
+class RegexParser:
+    # Thompson construction into a FiniteAutomaton: literals, (), |, *, + and ?, with backslash escapes.
+    # Every fragment is a (start, end) pair of states; fragments are joined by epsilon moves.
+    SPECIAL = '|*+?()\\'
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.position = 0
+        self.Q = []
+        self.Delta = {}
+        self.symbols = set()
+
+    def compile(self):
+        start, end = self.parse_alternation()
+        if self.position < len(self.pattern):
+            raise ValueError(f"Unexpected '{self.pattern[self.position]}' at position {self.position}")
+        return FiniteAutomaton(self.Q, sorted(self.symbols), self.Delta, start, [end])
+
+    def new_state(self):
+        state = f't{len(self.Q)}'
+        self.Q.append(state)
+        return state
+
+    def edge(self, source, symbol, target):
+        self.Delta.setdefault((source, symbol), []).append(target)
+
+    def peek(self):
+        return self.pattern[self.position] if self.position < len(self.pattern) else None
+
+    def parse_alternation(self):
+        fragments = [self.parse_concatenation()]
+        while self.peek() == '|':
+            self.position += 1
+            fragments.append(self.parse_concatenation())
+        if len(fragments) == 1:
+            return fragments[0]
+        start, end = self.new_state(), self.new_state()
+        for fragment_start, fragment_end in fragments:
+            self.edge(start, '', fragment_start)
+            self.edge(fragment_end, '', end)
+        return start, end
+
+    def parse_concatenation(self):
+        start = end = None
+        while self.peek() is not None and self.peek() not in '|)':
+            fragment_start, fragment_end = self.parse_repetition()
+            if start is None:
+                start = fragment_start
+            else:
+                self.edge(end, '', fragment_start)
+            end = fragment_end
+        if start is None:
+            start = end = self.new_state()  # empty alternative matches the empty string
+        return start, end
+
+    def parse_repetition(self):
+        inner_start, inner_end = self.parse_atom()
+        while self.peek() is not None and self.peek() in '*+?':
+            operator = self.peek()
+            self.position += 1
+            start, end = self.new_state(), self.new_state()
+            self.edge(start, '', inner_start)
+            self.edge(inner_end, '', end)
+            if operator in '*+':
+                self.edge(inner_end, '', inner_start)
+            if operator in '*?':
+                self.edge(start, '', end)
+            inner_start, inner_end = start, end
+        return inner_start, inner_end
+
+    def parse_atom(self):
+        symbol = self.peek()
+        if symbol == '(':
+            self.position += 1
+            fragment = self.parse_alternation()
+            if self.peek() != ')':
+                raise ValueError(f"Missing ')' at position {self.position}")
+            self.position += 1
+            return fragment
+        if symbol == '\\':
+            self.position += 1
+            symbol = self.peek()
+            if symbol is None:
+                raise ValueError("Pattern ends with an escape character")
+        elif symbol in self.SPECIAL:
+            raise ValueError(f"Unexpected '{symbol}' at position {self.position}")
+        self.position += 1
+        start, end = self.new_state(), self.new_state()
+        self.edge(start, symbol, end)
+        self.symbols.add(symbol)
+        return start, end
+
+
+def regex_to_nfa(pattern):
+    return RegexParser(pattern).compile()
+
+
+class BitParallelNFA:
+    # The state set is one int. For each symbol and each 8-bit slice of the state bitmask a 256-entry
+    # table gives the closed successor set, so a step costs one lookup and one OR per slice.
+    # The tables take len(symbols) * ceil(states / 8) * 256 entries and a step touches every slice,
+    # so this only pays for small NFAs: more than max_states states (64 by default, a few machine
+    # words) raise ValueError, and accepts or lazy_dfa should be used instead.
+    def __init__(self, automaton, max_states=64):
+        moves, self.start, self.final_mask = automaton.nfa_tables()
+        if len(moves) > max_states:
+            raise ValueError(f"{len(moves)} states is over the bit-parallel limit of {max_states}")
+        symbols = {symbol for row in moves for symbol in row}
+        self.tables = {}
+        for symbol in symbols:
+            slices = []
+            for base in range(0, len(moves), 8):
+                table = [0] * 256
+                for value in range(1, 256):
+                    low = value & -value
+                    state = base + low.bit_length() - 1
+                    target = moves[state].get(symbol, 0) if state < len(moves) else 0
+                    table[value] = table[value ^ low] | target
+                slices.append(table)
+            self.tables[symbol] = slices
+
+    def step(self, current, symbol):
+        slices = self.tables.get(symbol)
+        if slices is None:
+            return 0
+        following = 0
+        for table in slices:
+            if not current:
+                break
+            following |= table[current & 255]
+            current >>= 8
+        return following
+
+    def accepts(self, input_string):
+        current = self.start
+        for symbol in input_string:
+            current = self.step(current, symbol)
+            if not current:
+                return False
+        return bool(current & self.final_mask)
+
+    def match_ends(self, text):
+        # Unanchored scan: the start set is re-entered at every position; yields each end of a match
+        start = self.start
+        final_mask = self.final_mask
+        current = start
+        if current & final_mask:
+            yield 0
+        for position, symbol in enumerate(text, 1):
+            current = self.step(current, symbol) | start
+            if current & final_mask:
+                yield position
+
+
+# mode -> (is the pair accepting, can the pair still lead to an accepting pair)
+PRODUCT_MODES = {
+    'intersection': (lambda in_first, in_second: in_first and in_second, lambda first, second: first and second),
+    'union': (lambda in_first, in_second: in_first or in_second, lambda first, second: first or second),
+    'difference': (lambda in_first, in_second: in_first and not in_second, lambda first, second: first),
+}
+
+
+def product_states(first, second, mode):
+    # Yields (state id, accepting, {symbol: state id}) for pairs of subset states reachable from the
+    # start pair, one at a time, so a caller looking for an accepting pair can stop at the first one
+    accept, alive = PRODUCT_MODES[mode]
+    first_moves, first_start, first_final = first.nfa_tables()
+    second_moves, second_start, second_final = second.nfa_tables()
+    symbols = sorted(set(first.Sigma) | set(second.Sigma))
+    pairs = [(first_start, second_start)]
+    ids = {pairs[0]: 0}
+    i = 0
+    while i < len(pairs):
+        first_mask, second_mask = pairs[i]
+        row = {}
+        for symbol in symbols:
+            pair = (move(first_moves, first_mask, symbol), move(second_moves, second_mask, symbol))
+            if not alive(*pair):
+                continue
+            if pair not in ids:
+                ids[pair] = len(pairs)
+                pairs.append(pair)
+            row[symbol] = ids[pair]
+        yield i, accept(bool(first_mask & first_final), bool(second_mask & second_final)), row
+        i += 1
+
+
+def build_product(first, second, mode):
+    Q = []
+    Delta = {}
+    F = []
+    for state, accepting, row in product_states(first, second, mode):
+        Q.append(f'p{state}')
+        if accepting:
+            F.append(f'p{state}')
+        for symbol, target in row.items():
+            Delta[(f'p{state}', symbol)] = [f'p{target}']
+    return FiniteAutomaton(Q, sorted(set(first.Sigma) | set(second.Sigma)), Delta, 'p0', F)
+
+
+class DenseDFA:
+    # Start state 0, table[state * len(symbols) + symbol id] = next state or -1, one accept bit per state
+    MAGIC = b'DFA1'
+
+    def __init__(self, symbols, state_count, table, accept_bitmap, names=None):
+        self.symbols = symbols
+        self.symbol_ids = {symbol: i for i, symbol in enumerate(symbols)}
+        self.state_count = state_count
+        self.table = table
+        self.accept_bitmap = accept_bitmap
+        self.names = names if names is not None else [f'd{state}' for state in range(state_count)]
+
+    def is_accepting(self, state):
+        return bool(self.accept_bitmap[state >> 3] >> (state & 7) & 1)
+
+    def accepts(self, input_string):
+        table = self.table
+        symbol_ids = self.symbol_ids
+        width = len(self.symbols)
+        state = 0
+        for symbol in input_string:
+            code = symbol_ids.get(symbol)
+            if code is None:
+                return False
+            state = table[state * width + code]
+            if state < 0:
+                return False
+        return self.is_accepting(state)
+
+    def transitions(self):
+        width = len(self.symbols)
+        return {self.names[state]: {symbol: self.names[self.table[state * width + code]]
+                                    for code, symbol in enumerate(self.symbols)
+                                    if self.table[state * width + code] >= 0}
+                for state in range(self.state_count)}
+
+    def show(self):
+        print(f"Q = {self.names}")
+        print(f"Sigma = {self.symbols}")
+        print(f"Delta = {self.transitions()}")
+        print(f"q0 = {self.names[0]}")
+        print(f"F = {[name for state, name in enumerate(self.names) if self.is_accepting(state)]}")
+
+    def render(self, name="DFA"):
+        from automathon import DFA  # Graphviz is only needed when a picture is asked for
 
         dfa = DFA(
-            states,
-            input_symbols,
-            transitions,
-            initial_state,
-            list(final_states)  # Convert set to list
+            self.names,
+            self.symbols,
+            self.transitions(),
+            self.names[0],
+            [name for state, name in enumerate(self.names) if self.is_accepting(state)]
         )
-        dfa.view("DFA")
+        dfa.view(name)
+
+    def save(self, path):
+        # Layout: magic, symbol count, state count, symbols (length-prefixed UTF-8), padding to 4 bytes,
+        # little-endian int32 transition table, accept bitmap
+        header = bytearray(self.MAGIC + struct.pack('<II', len(self.symbols), self.state_count))
+        for symbol in self.symbols:
+            encoded = symbol.encode('utf-8')
+            header += struct.pack('<H', len(encoded)) + encoded
+        header += bytes(-len(header) % 4)
+        table = array('i', self.table)
+        if sys.byteorder != 'little':
+            table.byteswap()
+        with open(path, 'wb') as file:
+            file.write(header)
+            file.write(table.tobytes())
+            file.write(bytes(self.accept_bitmap))
+
+
+def load_dfa(path):
+    # The file is mapped, not read: the table and bitmap are zero-copy views over the mapping
+    with open(path, 'rb') as file:
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if data[:4] != DenseDFA.MAGIC:
+        raise ValueError(f"{path} is not a DenseDFA file")
+    symbol_count, state_count = struct.unpack_from('<II', data, 4)
+    offset = 12
+    symbols = []
+    for _ in range(symbol_count):
+        length, = struct.unpack_from('<H', data, offset)
+        symbols.append(data[offset + 2:offset + 2 + length].decode('utf-8'))
+        offset += 2 + length
+    offset += -offset % 4
+    view = memoryview(data)
+    table_end = offset + 4 * state_count * symbol_count
+    table = view[offset:table_end].cast('i')
+    if sys.byteorder != 'little':
+        table = array('i', table)
+        table.byteswap()
+    accept_bitmap = view[table_end:table_end + (state_count + 7) // 8]
+    return DenseDFA(symbols, state_count, table, accept_bitmap)
+
+
+class SearchAutomaton:
+    # Unanchored DFA built lazily over a DenseDFA. A search state is the tuple of live DenseDFA
+    # states; the start state 0 is re-entered at every position (self-loop on start).
+    # Every slot of a search state carries a group of match starts, so one pass finds all of them.
+    def __init__(self, dfa):
+        self.dfa = dfa
+        self.unknown = len(dfa.symbols)  # extra column for symbols outside the alphabet
+        self.width = self.unknown + 1
+        self.states = [()]
+        self.state_ids = {(): 0}
+        self.rows = [[None] * self.width]
+        self.accept_slots = [()]
+
+    def step(self, state, code):
+        return -1 if code == self.unknown else self.dfa.table[state * self.unknown + code]
+
+    def transition(self, state_id, code):
+        states = self.states[state_id]
+        targets = {}
+        for slot, state in enumerate(states):
+            target = self.step(state, code)
+            if target >= 0:
+                targets.setdefault(target, []).append(slot)
+        target = self.step(0, code)
+        if target >= 0:
+            targets.setdefault(target, []).append(-1)  # -1 is the thread started at this position
+        next_states = tuple(sorted(targets))
+        if next_states not in self.state_ids:
+            self.state_ids[next_states] = len(self.states)
+            self.states.append(next_states)
+            self.rows.append([None] * self.width)
+            self.accept_slots.append(tuple(slot for slot, state in enumerate(next_states)
+                                           if self.dfa.is_accepting(state)))
+        sources = tuple(tuple(targets[state]) for state in next_states)
+        kept = {slot for source in sources for slot in source}
+        dropped = tuple(slot for slot in range(len(states)) if slot not in kept)
+        entry = (self.state_ids[next_states], sources, dropped, -1 not in kept)
+        self.rows[state_id][code] = entry
+        return entry
+
+    def search(self, source, overlapping=False, chunk_size=1 << 16):
+        symbol_ids = self.dfa.symbol_ids
+        unknown = self.unknown
+        start_accepting = self.dfa.is_accepting(0)
+        rows = self.rows
+        accept_slots = self.accept_slots
+
+        # member = [start, end, join position, alive]; group = [members, last accepting end]
+        groups = []
+        pending = deque()  # members in start order, reported once they are dead
+        next_allowed = 0
+        state_id = 0
+        pos = 0
+        for chunk in read_chunks(source, chunk_size):
+            for symbol in chunk:
+                code = symbol_ids.get(symbol, unknown)
+                entry = rows[state_id][code]
+                if entry is None:
+                    entry = self.transition(state_id, code)
+                next_id, sources, dropped, start_dropped = entry
+                if not (state_id or next_id or start_accepting):
+                    pos += 1  # idle: no live threads and the start thread dies at once
+                    continue
+
+                member = None
+                if start_accepting or not start_dropped:
+                    member = [pos, pos if start_accepting else None, pos, True]
+                    pending.append(member)
+                next_groups = []
+                for slots in sources:
+                    merged = [groups[slot] if slot >= 0 else [[member], None] for slot in slots]
+                    group = max(merged, key=lambda g: len(g[0]))
+                    for other in merged:
+                        if other is not group:
+                            # Smaller group joins the larger one; flush its pending accept first
+                            end = other[1]
+                            for joined in other[0]:
+                                if end is not None and end > joined[2]:
+                                    joined[1] = end
+                                joined[2] = pos
+                                group[0].append(joined)
+                    next_groups.append(group)
+                for slot in dropped:
+                    finish_group(groups[slot])
+                if member is not None and start_dropped:
+                    member[3] = False
+                groups = next_groups
+                pos += 1
+                for slot in accept_slots[next_id]:
+                    groups[slot][1] = pos
+                state_id = next_id
+
+                while pending and not pending[0][3]:
+                    start, end, _, _ = pending.popleft()
+                    if end is None:
+                        continue
+                    if overlapping:
+                        yield start, end
+                    elif start >= next_allowed:
+                        yield start, end
+                        next_allowed = end if end > start else start + 1
+
+        for group in groups:
+            finish_group(group)
+        if start_accepting:
+            pending.append([pos, pos, pos, False])
+        for start, end, _, _ in pending:
+            if end is None:
+                continue
+            if overlapping:
+                yield start, end
+            elif start >= next_allowed:
+                yield start, end
+                next_allowed = end if end > start else start + 1
+
+
+def finish_group(group):
+    members, end = group
+    for member in members:
+        if end is not None and end > member[2]:
+            member[1] = end
+        member[3] = False
+
+
+def read_chunks(source, chunk_size):
+    # Text pieces from a str, a file object or a bytes-like object such as an mmap
+    if isinstance(source, str):
+        yield source
+    elif isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        # latin-1 keeps one character per byte, so positions are byte offsets
+        for offset in range(0, len(source), chunk_size):
+            yield bytes(source[offset:offset + chunk_size]).decode('latin-1')
+    else:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk.decode('latin-1') if isinstance(chunk, bytes) else chunk
+
+
+def move(moves, current, symbol):
+    # NFA step on bitmasks: union of the closed targets of every state in current
+    following = 0
+    while current:
+        low = current & -current
+        current ^= low
+        following |= moves[low.bit_length() - 1].get(symbol, 0)
+    return following
+
+
+class LazyDFA:
+    # Subset states are built only when the input reaches them and kept in a bounded cache.
+    # A full cache is flushed. If it fills again within too few symbols, counted across calls,
+    # it is thrashing: it is still flushed, and the rest of that string is matched by NFA simulation.
+    def __init__(self, automaton, cache_size=1024, min_symbols_per_state=10):
+        self.moves, self.start, self.final_mask = automaton.nfa_tables()
+        self.cache_size = cache_size
+        self.min_symbols_per_state = min_symbols_per_state
+        self.cache = {}  # state bitmask -> {symbol: next state bitmask}
+        self.symbols = 0  # symbols read by all calls so far
+        self.last_flush = 0  # value of self.symbols at the last flush
+        self.flushes = 0
+        self.fallbacks = 0
+
+    def accepts(self, input_string):
+        moves = self.moves
+        cache = self.cache
+        current = self.start
+        row = cache.setdefault(current, {})
+        base = self.symbols
+        for position, symbol in enumerate(input_string):
+            following = row.get(symbol)
+            if following is None:
+                following = move(moves, current, symbol)
+                if following not in cache:
+                    if len(cache) >= self.cache_size:
+                        # Thrashing: states are not reused enough to pay for building them
+                        thrashing = base + position - self.last_flush < self.cache_size * self.min_symbols_per_state
+                        cache.clear()
+                        self.flushes += 1
+                        self.last_flush = base + position
+                        if thrashing:
+                            self.fallbacks += 1
+                            self.symbols = base + len(input_string)
+                            current = following
+                            for i in range(position + 1, len(input_string)):
+                                if not current:
+                                    break
+                                current = move(moves, current, input_string[i])
+                            return bool(current & self.final_mask)
+                        row = cache[current] = {}
+                    cache[following] = {}
+                row[symbol] = following
+            current = following
+            if not current:
+                self.symbols = base + position + 1
+                return False
+            row = cache[current]
+        self.symbols = base + len(input_string)
+        return bool(current & self.final_mask)
 
 
 class Grammar:
@@ -112,24 +803,29 @@ class Grammar:
 
 
 # main
-finite_automaton = FiniteAutomaton()
-grammar = finite_automaton.convert_to_grammar()
-print("Grammar:")
-grammar.show_grammar()
-
-print()
-
-if not finite_automaton.check_deterministic():
-    print("It's a Non-Deterministic Finite Automaton\n")
-else:
-    print("It's a Deterministic Finite Automaton\n")
-
-print("Deterministic Finite Automaton:")
-finite_automaton.nfa_to_dfa()
-
-# NFA to compare graphically with DFA
-NFA({'q0', 'q1', 'q2', 'q3'}, {'a', 'b'},
-    {'q0': {'a': {'q1'}, 'b': {'q0'}},
-     'q1': {'a': {'q2', 'q3'}},
-     'q2': {'b': {'q0'}, 'a': {'q3'}}},
-    'q0', {'q3'}).view("NFA")
+if __name__ == "__main__":
+    finite_automaton = FiniteAutomaton()
+    grammar = finite_automaton.convert_to_grammar()
+    print("Grammar:")
+    grammar.show_grammar()
+
+    print()
+
+    if not finite_automaton.check_deterministic():
+        print("It's a Non-Deterministic Finite Automaton\n")
+    else:
+        print("It's a Deterministic Finite Automaton\n")
+
+    print("Deterministic Finite Automaton:")
+    dfa = finite_automaton.nfa_to_dfa()
+    dfa.show()
+    dfa.render("DFA")
+
+    # NFA to compare graphically with DFA
+    from automathon import NFA
+    NFA({'q0', 'q1', 'q2', 'q3'}, {'a', 'b'},
+        {'q0': {'a': {'q1'}, 'b': {'q0'}},
+         'q1': {'a': {'q2', 'q3'}},
+         'q2': {'b': {'q0'}, 'a': {'q3'}}},
+        'q0', {'q3'}).view("NFA")
+
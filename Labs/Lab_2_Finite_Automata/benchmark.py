@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from Lab_2 import FiniteAutomaton
+
+# The grammar half of the benchmark times Lab_1, which lives in its own folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lab_1_Regular_Grammars'))
+import Lab_1
+
+
+# GENERATORS
+def random_nfa(states, alphabet_size, density, epsilon_ratio, seed):
+    # density = expected number of targets per (state, symbol); epsilon_ratio = share of epsilon moves
+    rng = random.Random(seed)
+    Q = [f'q{i}' for i in range(states)]
+    Sigma = [f's{i}' if alphabet_size > 26 else chr(ord('a') + i) for i in range(alphabet_size)]
+    Delta = {}
+    for state in Q:
+        for symbol in Sigma:
+            targets = rng_targets(rng, Q, density)
+            if targets:
+                Delta[(state, symbol)] = targets
+        if rng.random() < epsilon_ratio:
+            Delta[(state, '')] = rng_targets(rng, Q, density) or [rng.choice(Q)]
+    F = rng.sample(Q, max(1, states // 10))
+    return FiniteAutomaton(Q, Sigma, Delta, 'q0', F)
+
+
+def rng_targets(rng, Q, density):
+    count = int(density) + (rng.random() < density - int(density))
+    return rng.sample(Q, min(count, len(Q)))
+
+
+def random_grammar(non_terminals, alphabet_size, density, seed):
+    # Right-linear grammar: every non-terminal gets about density * alphabet_size productions
+    rng = random.Random(seed)
+    grammar = Lab_1.Grammar()
+    grammar.V_n = {'S'} | {f'N{i}' for i in range(1, non_terminals)}
+    grammar.V_t = {chr(ord('a') + i) for i in range(alphabet_size)}
+    names = sorted(grammar.V_n)
+    terminals = sorted(grammar.V_t)
+    grammar.P = {}
+    for name in names:
+        productions = [rng.choice(terminals) + rng.choice(names)
+                       for _ in range(max(1, round(density * alphabet_size)))]
+        productions.append(rng.choice(terminals))
+        grammar.P[name] = productions
+    return grammar
+
+
+def random_words(alphabet, count, length, seed):
+    rng = random.Random(seed)
+    return [''.join(rng.choice(alphabet) for _ in range(length)) for _ in range(count)]
+
+
+# MEASUREMENT
+def measure(function, *args):
+    # Wall time of one call, and the peak memory it allocated from a second, traced call, since
+    # tracing slows every allocation and would skew the timing
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    return result, {'seconds': elapsed, 'peak_bytes': peak_memory(function, *args)}
+
+
+def peak_memory(function, *args):
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def bench_size(size, args):
+    seed = args.seed + size
+    row = {'size': size}
+
+    grammar = random_grammar(size, args.alphabet, args.density, seed)
+    automaton, row['to_finite_automaton'] = measure(grammar.to_finite_automaton)
+    _, row['compile'] = measure(automaton.compile)
+    words = random_words(sorted(grammar.V_t), args.words, args.word_length, seed)
+    _, row['string_belongs_to_language'] = measure(
+        lambda: [automaton.string_belongs_to_language(word) for word in words])
+    row['string_belongs_to_language']['words'] = len(words)
+    row['lab_1_dfa_states'] = len(automaton.compiled.table)
+
+    nfa = random_nfa(size, args.alphabet, args.density, args.epsilon, seed)
+    dfa, row['nfa_to_dfa'] = measure(nfa.nfa_to_dfa)
+    row['dfa_states'] = dfa.state_count
+    _, row['convert_to_grammar'] = measure(nfa.convert_to_grammar)
+    return row
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scaling benchmark for the Lab_1 and Lab_2 automata")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[8, 16, 32, 64])
+    parser.add_argument('--alphabet', type=int, default=4)
+    parser.add_argument('--density', type=float, default=0.5)
+    parser.add_argument('--epsilon', type=float, default=0.02)
+    parser.add_argument('--words', type=int, default=2000)
+    parser.add_argument('--word-length', type=int, default=32)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='automata_benchmark.json')
+    args = parser.parse_args(argv)
+
+    report = {
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'parameters': vars(args),
+        'results': [],
+    }
+    for size in args.sizes:
+        row = bench_size(size, args)
+        report['results'].append(row)
+        print(f"size {size:>6}: nfa_to_dfa {row['nfa_to_dfa']['seconds']:.4f}s "
+              f"({row['dfa_states']} DFA states), membership {row['string_belongs_to_language']['seconds']:.4f}s")
+
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import random
+import unittest
+
+import test
+
+
+PIECES = ['a', 'c', 'h', 'r', 'char', 'ch', 'x1', 'if', '1', '23', '4.5', '.', '"', '\\', '\\"', '/', '//', '*',
+          '+', '=', '<', '<=', ';', ' ', '\n', '\n', '@', '/*', '*/']
+
+
+class TestRelex(unittest.TestCase):
+    # relex must give exactly what lexing the edited text from scratch gives
+
+    def snapshot(self, result):
+        # Read through the accessors, since a relexed stream keeps its offsets unmoved
+        stream, errors = result
+        return (list(stream.types), [stream.start(i) for i in range(len(stream))],
+                [stream.end(i) for i in range(len(stream))], [(token.type, token.value) for token in stream],
+                [(error.pos_start.idx, error.pos_end.col, error.as_string()) for error in errors])
+
+    def positions(self, stream):
+        return [(position.ln, position.col) for position in map(stream.position, range(len(stream.text) + 1))]
+
+    def assertRelexed(self, text, offset, deleted, inserted, lines=False, stream=None):
+        if stream is None:
+            stream, _ = test.run_compact('<relex>', text)
+        if lines:
+            stream.position(0)  # builds line_starts, which relex then has to splice
+        had_lines = stream.line_starts is not None
+        edited = text[:offset] + inserted + text[offset + deleted:]
+        relexed = test.relex(stream, offset, deleted, inserted)
+        expected = test.run_compact('<relex>', edited, stream.symbols)  # identifiers compare by symbol ID
+        self.assertEqual(self.snapshot(relexed), self.snapshot(expected), (text, offset, deleted, inserted))
+        if had_lines:
+            self.assertEqual(self.positions(relexed[0]), self.positions(expected[0]))
+        return relexed
+
+    def test_edit_inside_string(self):
+        text = 'a = "hello world" + b\nc'
+        self.assertRelexed(text, 8, 1, 'X')
+        self.assertRelexed(text, 8, 0, '"')  # closes the string early
+        self.assertRelexed(text, 16, 1, '')  # removes the closing quote
+        self.assertRelexed(text, 10, 0, '\\"', lines=True)
+
+    def test_edit_inside_block_comment(self):
+        text = 'x /* one\ntwo */ y @ z'
+        self.assertRelexed(text, 5, 3, 'three', lines=True)
+        with self.assertRaisesRegex(Exception, 'Unterminated multi-line comment'):  # as run_compact raises
+            test.relex(test.run_compact('<relex>', text)[0], 13, 2, '')
+        self.assertRelexed(text, 2, 2, '')
+        self.assertRelexed(text, 16, 0, '/* new */')
+
+    def test_less_equal_boundaries(self):
+        text = 'a < b <= c'
+        self.assertRelexed(text, 3, 0, '=')  # '<' becomes '<='
+        self.assertRelexed(text, 7, 1, '')  # '<=' becomes '<'
+        self.assertRelexed(text, 6, 1, '')
+        self.assertRelexed(text, 4, 0, '<')
+
+    def test_edit_at_start(self):
+        text = 'if a\nb @ 1.5'
+        self.assertRelexed(text, 0, 0, 'x')
+        self.assertRelexed(text, 0, 0, '\n\n', lines=True)
+        self.assertRelexed(text, 0, 2, '')
+        self.assertRelexed('', 0, 0, 'a b')
+
+    def test_edit_with_newlines(self):
+        text = 'a\nb\nc @ d\n'
+        self.assertRelexed(text, 1, 1, '', lines=True)
+        self.assertRelexed(text, 2, 3, 'x\ny\n', lines=True)
+        self.assertRelexed(text, len(text), 0, '\n@', lines=True)
+        self.assertRelexed(text, 4, 0, '// note\n', lines=True)
+
+    def test_random_edits(self):
+        rng = random.Random(0)
+        for _ in range(1500):
+            text = ''.join(rng.choice(PIECES) for _ in range(rng.randint(0, 20)))
+            try:
+                test.run_compact('<relex>', text)
+            except Exception:
+                continue
+            offset = rng.randint(0, len(text))
+            deleted = rng.randint(0, min(3, len(text) - offset))
+            inserted = ''.join(rng.choice(PIECES) for _ in range(rng.randint(0, 2)))
+            edited = text[:offset] + inserted + text[offset + deleted:]
+            try:
+                test.run_compact('<relex>', edited)
+            except Exception as error:
+                with self.assertRaises(type(error)):
+                    test.relex(test.run_compact('<relex>', text)[0], offset, deleted, inserted)
+                continue
+            self.assertRelexed(text, offset, deleted, inserted, lines=rng.random() < 0.5)
+
+    def test_edits_in_sequence(self):
+        # Each edit relexes the previous result, so the unmoved offsets of several edits pile up
+        rng = random.Random(1)
+        for _ in range(40):
+            text = ''.join(rng.choice(PIECES) for _ in range(rng.randint(0, 40)))
+            try:
+                stream, _ = test.run_compact('<relex>', text)
+            except Exception:
+                continue
+            if rng.random() < 0.5:
+                stream.position(0)
+            for _ in range(30):
+                offset = rng.randint(0, len(text))
+                deleted = rng.randint(0, min(3, len(text) - offset))
+                inserted = ''.join(rng.choice(PIECES) for _ in range(rng.randint(0, 2)))
+                edited = text[:offset] + inserted + text[offset + deleted:]
+                try:
+                    test.run_compact('<relex>', edited)
+                except Exception:
+                    continue
+                stream, _ = self.assertRelexed(text, offset, deleted, inserted, stream=stream)
+                text = edited
+            expected, _ = test.run_compact('<relex>', text)
+            stream.settle()
+            self.assertEqual((stream.starts, stream.ends, stream.error_ends), (expected.starts, expected.ends,
+                                                                               expected.error_ends))
+            if stream.line_starts is not None:
+                expected.position(0)
+                self.assertEqual(stream.line_starts, expected.line_starts)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+
+import service
+import test
+
+
+SOURCES = [
+    '',
+    'if x <= 3.5 { return "a\\nb" }',
+    'char c = 12; // note\nwhile (c >= 1) c = c - 1',
+    '/* block\ncomment */ a < b > c @ d',
+    '"open string',
+    'a @ b $ c\n?',
+]
+
+
+class TestLexerService(unittest.TestCase):
+    # The service runs on its own event loop in a thread; the tests talk to it through LexerClient
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        started = threading.Event()
+
+        async def serve():
+            cls.service = service.LexerService(workers=2)
+            await cls.service.start(**cls.listen())
+            cls.loop = asyncio.get_running_loop()
+            cls.stop = asyncio.Event()
+            started.set()
+            await cls.stop.wait()
+            await cls.service.close()
+
+        cls.thread = threading.Thread(target=asyncio.run, args=(serve(),))
+        cls.thread.start()
+        started.wait(30)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.loop.call_soon_threadsafe(cls.stop.set)
+        cls.thread.join(30)
+        cls.directory.cleanup()
+
+    @classmethod
+    def listen(cls):
+        return {'port': 0}
+
+    def client(self):
+        return service.LexerClient(port=self.service.address()[1], timeout=30)
+
+    def assertSameTokens(self, text, result):
+        stream, errors = result
+        expected, expected_errors = test.run_compact('<service>', text)
+        self.assertEqual([(token.type, token.value) for token in stream],
+                         [(token.type, token.value) for token in expected])
+        self.assertEqual([error.as_string() for error in errors], [error.as_string() for error in expected_errors])
+
+    def test_tokenize(self):
+        with self.client() as client:
+            for text in SOURCES:
+                self.assertSameTokens(text, client.tokenize(text))
+
+    def test_tokenize_many(self):
+        texts = SOURCES * 50
+        with self.client() as client:
+            for text, result in zip(texts, client.tokenize_many(texts)):
+                self.assertSameTokens(text, result)
+
+    def test_error_frames(self):
+        with self.client() as client:
+            with self.assertRaisesRegex(service.ServiceError, 'Unterminated multi-line comment'):
+                client.tokenize('a /* open')
+            with self.assertRaisesRegex(service.ServiceError, 'ValueError'):
+                client.tokenize('x = 1.2.3')
+            self.assertSameTokens('after', client.tokenize('after'))
+
+    def test_oversized_request(self):
+        with self.client() as client:
+            client.socket.sendall(service.FRAME.pack(service.MAX_REQUEST + 1))
+            with self.assertRaisesRegex(service.ServiceError, 'limit'):
+                service.decode_tokens(client.receive(), '<service>', '')
+
+
+class TestLexerServiceUnixSocket(TestLexerService):
+    @classmethod
+    def listen(cls):
+        return {'path': os.path.join(cls.directory.name, 'lexer.sock')}
+
+    def client(self):
+        return service.LexerClient(path=self.service.address(), timeout=30)
+
+
+if __name__ == '__main__':
+    unittest.main()
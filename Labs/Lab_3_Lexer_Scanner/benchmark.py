@@ -0,0 +1,204 @@
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import test
+
+# Token mix of the synthetic corpus: relative weights, changed with --mix name=weight,...
+DEFAULT_MIX = {
+    'identifier': 30,
+    'keyword': 6,
+    'number': 12,
+    'string': 6,
+    'comment': 3,
+    'operator': 35,
+    'newline': 8,
+    'error': 1,
+}
+OPERATORS = ['+', '-', '*', '/', '(', ')', ',', '=', '<', '>', '<=', '>=', ':', ';', '{', '}']
+ILLEGAL_CHARACTERS = '@#$?!'
+
+
+# GENERATORS
+def random_word(rng, first='abcdefghijklmnopqrstuvwxyz_', rest='abcdefghijklmnopqrstuvwxyz0123456789_'):
+    return rng.choice(first) + ''.join(rng.choice(rest) for _ in range(rng.randint(0, 9)))
+
+
+def random_piece(rng, kind):
+    if kind == 'identifier':
+        return random_word(rng)
+    if kind == 'keyword':
+        return rng.choice(sorted(test.RESERVED_WORDS))
+    if kind == 'number':
+        number = str(rng.randint(0, 10 ** rng.randint(1, 6)))
+        return number + '.' + str(rng.randint(0, 999)) if rng.random() < 0.3 else number
+    if kind == 'string':
+        body = ' '.join(random_word(rng) for _ in range(rng.randint(0, 5)))
+        return '"' + (body + '\\n\\"' if rng.random() < 0.2 else body) + '"'
+    if kind == 'comment':
+        if rng.random() < 0.5:
+            return '// ' + ' '.join(random_word(rng) for _ in range(rng.randint(1, 6))) + '\n'
+        # the lexer does not nest comments, so an inner '/*' is plain text until the first '*/'
+        inner = ' /* ' + random_word(rng) if rng.random() < 0.3 else ''
+        return '/* ' + ' '.join(random_word(rng) for _ in range(rng.randint(1, 8))) + inner + ' */'
+    if kind == 'operator':
+        return rng.choice(OPERATORS)
+    if kind == 'newline':
+        return '\n'
+    return rng.choice(ILLEGAL_CHARACTERS)
+
+
+def random_source(size, mix, seed):
+    # About size characters of pieces drawn by weight, separated by single spaces
+    rng = random.Random(seed)
+    kinds = sorted(mix)
+    weights = [mix[kind] for kind in kinds]
+    pieces = []
+    length = 0
+    while length < size:
+        piece = random_piece(rng, rng.choices(kinds, weights)[0])
+        pieces.append(piece)
+        length += len(piece) + 1
+    return ' '.join(pieces)
+
+
+def parse_mix(text):
+    mix = dict(DEFAULT_MIX)
+    for item in filter(None, text.split(',')):
+        name, _, weight = item.partition('=')
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown token kind '{name}'")
+        mix[name] = float(weight)
+    return mix
+
+
+# MEASUREMENT
+def measure(function, *args):
+    # Wall time of one call
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def peak_memory(function, *args):
+    # Peak memory one call allocated, from its own run since tracing slows every allocation
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def count_run(text, fast):
+    tokens, _ = test.run('<bench>', text, fast)
+    return len(tokens)
+
+
+def count_compact(text):
+    stream, _ = test.run_compact('<bench>', text)
+    return len(stream)
+
+
+def count_stream(text):
+    tokens, _ = test.run_stream('<bench>', io.StringIO(text))
+    return sum(1 for _ in tokens)
+
+
+def count_parallel(text):
+    stream, _ = test.run_parallel('<bench>', text)
+    return len(stream)
+
+
+MODES = {
+    'run': lambda text: count_run(text, False),
+    'fast': lambda text: count_run(text, True),
+    'compact': count_compact,
+    'stream': count_stream,
+    'parallel': count_parallel,
+}
+
+
+def bench_size(size, args):
+    text = random_source(size, args.mix, args.seed + size)
+    megabytes = len(text.encode('utf-8')) / 1e6
+    row = {'size': size, 'megabytes': megabytes}
+    test.lexer_tables()  # loading the tables is start-up, not lexing
+    for mode in args.modes:
+        seconds = []
+        for _ in range(args.repeat):
+            tokens, elapsed = measure(MODES[mode], text)
+            seconds.append(elapsed)
+        best = min(seconds)
+        row[mode] = {
+            'seconds': best,
+            'tokens': tokens,
+            'tokens_per_second': tokens / best,
+            'megabytes_per_second': megabytes / best,
+            'peak_bytes': peak_memory(MODES[mode], text),
+        }
+    if args.profile:
+        profile = test.LexerProfile()
+        test.Lexer('<bench>', text, profile=profile).make_tokens()
+        row['profile'] = profile.report()
+    return row
+
+
+def print_profile(report):
+    for title, rows in report.items():
+        print(f"  {title}:")
+        for name, count, scan, handle in rows:
+            print(f"    {str(name):<14} {count:>9} matches  scan {scan:8.4f}s  handle {handle:8.4f}s")
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput benchmark for the Lab_3 lexer")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--mix', type=parse_mix, default=dict(DEFAULT_MIX),
+                        help="token weights, e.g. identifier=50,comment=10")
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=['run', 'fast', 'compact', 'stream'])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--profile', action='store_true', help="also time make_tokens per branch and token type")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='lexer_benchmark.json')
+    args = parser.parse_args(argv)
+
+    report = {
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'parameters': vars(args),
+        'results': [],
+    }
+    for size in args.sizes:
+        row = bench_size(size, args)
+        report['results'].append(row)
+        print(f"size {size:>9} ({row['megabytes']:.2f} MB):")
+        for mode in args.modes:
+            result = row[mode]
+            print(f"  {mode:<9} {result['tokens_per_second']:>12,.0f} tokens/s "
+                  f"{result['megabytes_per_second']:8.2f} MB/s  peak {result['peak_bytes'] / 1e6:8.2f} MB")
+        if args.profile:
+            print_profile(row['profile'])
+
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+import hashlib
+import os
+import struct
+import sys
+from array import array
+
+# Lexer generator: a list of (token type, pattern) in priority order becomes one minimized DFA over
+# character classes. The DFA is run with maximal munch: the longest match wins, and of two matches
+# of the same length the earlier entry does. Tables are cached on disk, keyed by a hash of the list.
+
+FORMAT_VERSION = 1
+MAGIC = b'LEX1'
+HEADER = struct.Struct('<4sIIII')  # magic, class count, row count, start row, mapped character count
+
+ESCAPE_SETS = {
+    's': (False, ' \t\n\r\f\v'),
+    'w': (False, 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_'),
+}
+ESCAPE_SETS.update({name.upper(): (True, chars) for name, (_, chars) in list(ESCAPE_SETS.items())})
+DIGIT_ESCAPES = 'dD'  # filled in by escape_set on first use, only compiling needs them
+ESCAPE_CHARACTERS = {'n': '\n', 't': '\t', 'r': '\r', 'f': '\f', 'v': '\v'}
+
+
+class PatternParser:
+    # Thompson construction like Lab_2's RegexParser, but every edge carries a character set
+    # (negated, characters) so classes such as [^*] and \s need no alphabet up front.
+    # Supports literals, [...] with ranges and ^, ., \d \s \w and their negations, (), (?:), |, *, + and ?.
+    # \d is every Unicode decimal digit, like re's; \s and \w are ASCII only.
+    SPECIAL = '|*+?()[.\\'
+
+    def __init__(self, pattern, nfa):
+        self.pattern = pattern
+        self.position = 0
+        self.nfa = nfa
+
+    def compile(self):
+        fragment = self.parse_alternation()
+        if self.position < len(self.pattern):
+            raise ValueError(f"Unexpected '{self.pattern[self.position]}' at position {self.position}")
+        return fragment
+
+    def peek(self):
+        return self.pattern[self.position] if self.position < len(self.pattern) else None
+
+    def parse_alternation(self):
+        fragments = [self.parse_concatenation()]
+        while self.peek() == '|':
+            self.position += 1
+            fragments.append(self.parse_concatenation())
+        if len(fragments) == 1:
+            return fragments[0]
+        start, end = self.nfa.new_state(), self.nfa.new_state()
+        for fragment_start, fragment_end in fragments:
+            self.nfa.epsilon(start, fragment_start)
+            self.nfa.epsilon(fragment_end, end)
+        return start, end
+
+    def parse_concatenation(self):
+        start = end = None
+        while self.peek() is not None and self.peek() not in '|)':
+            fragment_start, fragment_end = self.parse_repetition()
+            if start is None:
+                start = fragment_start
+            else:
+                self.nfa.epsilon(end, fragment_start)
+            end = fragment_end
+        if start is None:
+            start = end = self.nfa.new_state()  # empty alternative matches the empty string
+        return start, end
+
+    def parse_repetition(self):
+        inner_start, inner_end = self.parse_atom()
+        while self.peek() is not None and self.peek() in '*+?':
+            operator = self.peek()
+            self.position += 1
+            start, end = self.nfa.new_state(), self.nfa.new_state()
+            self.nfa.epsilon(start, inner_start)
+            self.nfa.epsilon(inner_end, end)
+            if operator in '*+':
+                self.nfa.epsilon(inner_end, inner_start)
+            if operator in '*?':
+                self.nfa.epsilon(start, end)
+            inner_start, inner_end = start, end
+        return inner_start, inner_end
+
+    def parse_atom(self):
+        symbol = self.peek()
+        if symbol == '(':
+            self.position += 1
+            if self.pattern.startswith('?:', self.position):
+                self.position += 2
+            fragment = self.parse_alternation()
+            if self.peek() != ')':
+                raise ValueError(f"Missing ')' at position {self.position}")
+            self.position += 1
+            return fragment
+        if symbol == '[':
+            charset = self.parse_class()
+        elif symbol == '.':
+            self.position += 1
+            charset = (True, '\n')
+        elif symbol == '\\':
+            charset = self.parse_escape()
+        elif symbol in self.SPECIAL:
+            raise ValueError(f"Unexpected '{symbol}' at position {self.position}")
+        else:
+            self.position += 1
+            charset = (False, symbol)
+        start, end = self.nfa.new_state(), self.nfa.new_state()
+        self.nfa.edge(start, charset, end)
+        return start, end
+
+    def parse_escape(self):
+        self.position += 1
+        symbol = self.peek()
+        if symbol is None:
+            raise ValueError("Pattern ends with an escape character")
+        self.position += 1
+        if symbol in ESCAPE_SETS or symbol in DIGIT_ESCAPES:
+            return escape_set(symbol)
+        return False, ESCAPE_CHARACTERS.get(symbol, symbol)
+
+    def parse_class(self):
+        self.position += 1
+        negated = self.peek() == '^'
+        if negated:
+            self.position += 1
+        included, excluded = set(), set()  # excluded collects negated escapes such as \S inside [...]
+        first = True
+        while self.peek() != ']' or first:
+            first = False
+            if self.peek() is None:
+                raise ValueError("Missing ']'")
+            if self.peek() == '\\':
+                escape_negated, chars = self.parse_escape()
+                (excluded if escape_negated else included).update(chars)
+                continue
+            low = self.peek()
+            self.position += 1
+            if self.peek() == '-' and self.position + 1 < len(self.pattern) and self.pattern[self.position + 1] != ']':
+                high = self.pattern[self.position + 1]
+                self.position += 2
+                included.update(chr(code) for code in range(ord(low), ord(high) + 1))
+            else:
+                included.add(low)
+        self.position += 1
+        if excluded:
+            # [\s\S] and the like: everything but the characters in neither part
+            rest = excluded - included
+            return (not negated), ''.join(sorted(rest))
+        return negated, ''.join(sorted(included))
+
+
+def escape_set(symbol):
+    if symbol not in ESCAPE_SETS:
+        digits = ''.join(chr(code) for code in range(sys.maxunicode + 1) if chr(code).isdecimal())
+        ESCAPE_SETS['d'], ESCAPE_SETS['D'] = (False, digits), (True, digits)
+    return ESCAPE_SETS[symbol]
+
+
+class PatternNFA:
+    def __init__(self):
+        self.edges = []  # per state: [(charset, target)]
+        self.epsilons = []  # per state: [target]
+        self.tags = {}  # end state -> index of its entry in the spec
+
+    def new_state(self):
+        self.edges.append([])
+        self.epsilons.append([])
+        return len(self.edges) - 1
+
+    def edge(self, source, charset, target):
+        self.edges[source].append((charset, target))
+
+    def epsilon(self, source, target):
+        self.epsilons[source].append(target)
+
+    def closure(self, states):
+        stack = list(states)
+        closed = set(states)
+        while stack:
+            for target in self.epsilons[stack.pop()]:
+                if target not in closed:
+                    closed.add(target)
+                    stack.append(target)
+        return frozenset(closed)
+
+
+def character_classes(charsets):
+    # Characters are grouped by which charsets contain them. Class 0 holds every character that
+    # no pattern names, plus any named character that behaves exactly like them.
+    charsets = sorted(set(charsets))
+    named = sorted({char for _, chars in charsets for char in chars})
+    unnamed = tuple(negated for negated, _ in charsets)
+    signatures = {unnamed: 0}
+    mapping = {}
+    for char in named:
+        signature = tuple((char in chars) != negated for negated, chars in charsets)
+        code = signatures.setdefault(signature, len(signatures))
+        if code:
+            mapping[char] = code
+    if len(signatures) > 256:
+        raise ValueError("Too many character classes")
+    members = {charset: {code for signature, code in signatures.items() if signature[i]}
+               for i, charset in enumerate(charsets)}
+    return mapping, len(signatures), members
+
+
+class LexerTables:
+    # Row offsets are stored in the table directly, so a step is table[row + class] with row 0 the
+    # dead row; tags[row] is the spec index a match ending in that row has, or -1.
+    def __init__(self, mapping, class_count, table, tags, start):
+        self.mapping = mapping
+        self.class_count = class_count
+        self.table = table
+        self.tags = tags
+        self.start = start
+        self.translation = ClassTranslation(mapping)
+
+    def scan(self, text):
+        # Yields (tag, start, end) for each longest match, and (-1, i, i + 1) where nothing matches
+        codes = text.translate(self.translation).encode('latin-1')
+        table = self.table
+        tags = self.tags
+        start = self.start
+        pos = 0
+        size = len(codes)
+        while pos < size:
+            row = start
+            tag = -1
+            end = pos + 1
+            i = pos
+            while i < size:
+                row = table[row + codes[i]]
+                if not row:
+                    break
+                i += 1
+                if tags[row] >= 0:
+                    tag = tags[row]
+                    end = i
+            yield tag, pos, end
+            pos = end
+
+    def to_bytes(self):
+        chars = array('I', [ord(char) for char in self.mapping])
+        codes = array('B', self.mapping.values())
+        return b''.join([
+            HEADER.pack(MAGIC, self.class_count, len(self.tags) // self.class_count, self.start, len(chars)),
+            chars.tobytes(), codes.tobytes(), self.table.tobytes(), self.tags.tobytes()
+        ])
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, class_count, rows, start, mapped = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a lexer table file")
+        offset = HEADER.size
+        sections = []
+        for typecode, count in (('I', mapped), ('B', mapped), ('I', rows * class_count), ('h', rows * class_count)):
+            section = array(typecode)
+            size = count * section.itemsize
+            section.frombytes(data[offset:offset + size])
+            sections.append(section)
+            offset += size
+        chars, codes, table, tags = sections
+        return cls(dict(zip(map(chr, chars), codes)), class_count, table, tags, start)
+
+
+class ClassTranslation(dict):
+    # str.translate table: named characters map to their class, everything else to class 0
+    def __init__(self, mapping):
+        super().__init__({ord(char): code for char, code in mapping.items()})
+
+    def __missing__(self, key):
+        return 0
+
+
+def compile_tables(spec):
+    nfa = PatternNFA()
+    start = nfa.new_state()
+    for index, (_, pattern) in enumerate(spec):
+        fragment_start, fragment_end = PatternParser(pattern, nfa).compile()
+        nfa.epsilon(start, fragment_start)
+        nfa.tags[fragment_end] = index
+
+    mapping, class_count, members = character_classes(
+        charset for edges in nfa.edges for charset, _ in edges)
+    moves = []  # per NFA state: class -> targets
+    for edges in nfa.edges:
+        row = {}
+        for charset, target in edges:
+            for code in members[charset]:
+                row.setdefault(code, []).append(target)
+        moves.append(row)
+
+    # Subset construction, with the empty set as state 0
+    dead = frozenset()
+    states = [dead, nfa.closure([start])]
+    index = {dead: 0, states[1]: 1}
+    transitions = []
+    for current in states:
+        row = []
+        for code in range(class_count):
+            targets = [target for state in current for target in moves[state].get(code, ())]
+            following = nfa.closure(targets) if targets else dead
+            if following not in index:
+                index[following] = len(states)
+                states.append(following)
+            row.append(index[following])
+        transitions.append(row)
+    tags = [min((nfa.tags[state] for state in current if state in nfa.tags), default=-1) for current in states]
+
+    # Moore minimization: split blocks by tag, then by the blocks their moves lead to
+    blocks = tags
+    while True:
+        signatures = {}
+        refined = [signatures.setdefault((blocks[state], tuple(blocks[target] for target in transitions[state])),
+                                         len(signatures)) for state in range(len(states))]
+        if len(signatures) == len(set(blocks)):
+            break
+        blocks = refined
+    blocks = refined
+
+    # Renumber so the dead state is row 0, then store row offsets
+    order = {blocks[0]: 0}
+    for state in range(len(states)):
+        order.setdefault(blocks[state], len(order))
+    table = array('I', [0] * (len(order) * class_count))
+    block_tags = array('h', [-1] * (len(order) * class_count))
+    for state in range(len(states)):
+        row = order[blocks[state]] * class_count
+        block_tags[row] = tags[state]
+        for code, target in enumerate(transitions[state]):
+            table[row + code] = order[blocks[target]] * class_count
+    return LexerTables(mapping, class_count, table, block_tags, order[blocks[1]] * class_count)
+
+
+def spec_key(spec):
+    return hashlib.sha256(repr((FORMAT_VERSION, sys.byteorder, list(spec))).encode('utf-8')).hexdigest()[:16]
+
+
+def load_tables(spec, cache_dir=None):
+    # Loads the tables for spec from cache_dir, compiling and saving them on a miss. The cache is
+    # only a speed-up: an unreadable or unwritable directory just means compiling every time.
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '__pycache__')
+    path = os.path.join(cache_dir, f'lexer-{spec_key(spec)}.tables')
+    try:
+        with open(path, 'rb') as f:
+            return LexerTables.from_bytes(f.read())
+    except (OSError, ValueError, struct.error):
+        pass
+    tables = compile_tables(spec)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        temporary = f'{path}.{os.getpid()}'
+        with open(temporary, 'wb') as f:
+            f.write(tables.to_bytes())
+        os.replace(temporary, path)
+    except OSError:
+        pass
+    return tables
@@ -0,0 +1,267 @@
+import argparse
+import asyncio
+import concurrent.futures
+import os
+import socket
+import struct
+import sys
+from array import array
+
+import test
+
+# Local tokenization service. Every message is a 4-byte big-endian length and a payload.
+# A request payload is UTF-8 source text. The response payload starts with RESPONSE_HEADER
+# (status, token count, error count). On success it is followed by the type codes (one byte each,
+# indexes into test.TOKEN_TYPES), then the start offsets, end offsets and error end offsets as
+# little-endian uint32. The offsets count characters of the request text, which the client
+# already has, so no token values are sent. On failure the rest is the UTF-8 error message.
+# Responses on a connection come back in request order, so clients may pipeline.
+
+FRAME = struct.Struct('>I')
+RESPONSE_HEADER = struct.Struct('<BII')
+STATUS_OK = 0
+STATUS_ERROR = 1
+MAX_REQUEST = 1 << 26
+
+
+class ServiceError(Exception):
+    pass
+
+
+# ENCODING
+def offsets_bytes(offsets):
+    offsets = array('I', offsets)
+    if sys.byteorder == 'big':
+        offsets.byteswap()
+    return offsets.tobytes()
+
+
+def offsets_array(data):
+    offsets = array('I')
+    offsets.frombytes(data)
+    if sys.byteorder == 'big':
+        offsets.byteswap()
+    return offsets
+
+
+def encode_error(message):
+    return RESPONSE_HEADER.pack(STATUS_ERROR, 0, 0) + message.encode('utf-8')
+
+
+def encode_tokens(text):
+    try:
+        stream = test.TokenStream('<service>', text)
+        stream.scan(0)
+    except Exception as error:  # the lexer raises plain Exception for an open comment
+        return encode_error(f'{type(error).__name__}: {error}')
+    return b''.join([RESPONSE_HEADER.pack(STATUS_OK, len(stream.types), len(stream.error_ends)), stream.types.tobytes(),
+                     offsets_bytes(stream.starts), offsets_bytes(stream.ends), offsets_bytes(stream.error_ends)])
+
+
+def decode_tokens(payload, fn, text):
+    # The (TokenStream, errors) that run_compact would give for text
+    status, count, error_count = RESPONSE_HEADER.unpack_from(payload)
+    if status != STATUS_OK:
+        raise ServiceError(payload[RESPONSE_HEADER.size:].decode('utf-8'))
+    stream = test.TokenStream(fn, text)
+    offset = RESPONSE_HEADER.size
+    stream.types.frombytes(payload[offset:offset + count])
+    offset += count
+    for name, size in (('starts', count), ('ends', count), ('error_ends', error_count)):
+        setattr(stream, name, array(stream.starts.typecode, offsets_array(payload[offset:offset + 4 * size])))
+        offset += 4 * size
+    return stream, stream.errors()
+
+
+# Pool worker: one executor call lexes a whole batch of small requests
+def encode_batch(payloads):
+    return [encode_tokens(payload.decode('utf-8', errors='replace')) for payload in payloads]
+
+
+# SERVER
+class Batcher:
+    # Sends a request to the pool at once while fewer than slots batches are running. Otherwise it
+    # waits, together with every request arriving meanwhile, until a batch finishes or batch_bytes
+    # of them are queued, so a burst of short inputs costs one round trip to a worker instead of many.
+    def __init__(self, executor, slots, batch_bytes):
+        self.executor = executor
+        self.slots = slots
+        self.batch_bytes = batch_bytes
+        self.pending = []
+        self.pending_bytes = 0
+        self.running = set()
+
+    def submit(self, payload):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((payload, future))
+        self.pending_bytes += len(payload)
+        if len(self.running) < self.slots or self.pending_bytes >= self.batch_bytes:
+            self.flush()
+        return future
+
+    def flush(self):
+        batch, self.pending, self.pending_bytes = self.pending, [], 0
+        if batch:
+            task = asyncio.ensure_future(self.run(batch))
+            self.running.add(task)
+            task.add_done_callback(self.finished)
+
+    def finished(self, task):
+        self.running.discard(task)
+        self.flush()
+
+    async def run(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, encode_batch, [payload for payload, _ in batch])
+        except Exception as error:  # a broken pool fails the whole batch
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class LexerService:
+    def __init__(self, workers=None, batch_bytes=1 << 16):
+        workers = workers or os.cpu_count() or 1
+        self.executor = concurrent.futures.ProcessPoolExecutor(workers)
+        self.batcher = Batcher(self.executor, workers, batch_bytes)
+        self.server = None
+        self.connections = {}  # handler task -> its writer, closed on shutdown
+
+    async def start(self, path=None, host='127.0.0.1', port=0):
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handle, path)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server
+
+    def address(self):
+        return self.server.sockets[0].getsockname()
+
+    async def handle(self, reader, writer):
+        # Requests are read and submitted as they arrive; responses are written in order
+        self.connections[asyncio.current_task()] = writer
+        responses = asyncio.Queue()
+        sender = asyncio.ensure_future(self.send(writer, responses))
+        try:
+            while True:
+                try:
+                    size, = FRAME.unpack(await reader.readexactly(FRAME.size))
+                    if size > MAX_REQUEST:
+                        # the rest of the stream cannot be framed any more, so answer and close
+                        refusal = asyncio.get_running_loop().create_future()
+                        refusal.set_result(encode_error(f"Request of {size} bytes is over the limit of {MAX_REQUEST}"))
+                        await responses.put(refusal)
+                        break
+                    payload = await reader.readexactly(size)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                await responses.put(self.batcher.submit(payload))
+        finally:
+            await responses.put(None)
+            await sender
+            self.connections.pop(asyncio.current_task(), None)
+
+    async def send(self, writer, responses):
+        try:
+            while True:
+                future = await responses.get()
+                if future is None:
+                    break
+                result = await future
+                writer.write(FRAME.pack(len(result)) + result)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            # closing the sockets ends each handler's read loop
+            for writer in self.connections.values():
+                writer.transport.abort()
+            await asyncio.gather(*self.connections, return_exceptions=True)
+            await self.server.wait_closed()
+        self.executor.shutdown()
+
+
+async def serve(path=None, host='127.0.0.1', port=0, workers=None):
+    service = LexerService(workers)
+    server = await service.start(path, host, port)
+    print(f"Lexer service listening on {service.address()}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+# CLIENT
+class LexerClient:
+    # Blocking client for a local service, for scripts and tests
+    def __init__(self, path=None, host='127.0.0.1', port=None, timeout=None):
+        if path is not None:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.settimeout(timeout)
+            self.socket.connect(path)
+        else:
+            self.socket = socket.create_connection((host, port), timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.socket.close()
+
+    def send(self, text):
+        payload = text.encode('utf-8')
+        self.socket.sendall(FRAME.pack(len(payload)) + payload)
+
+    def receive(self):
+        size, = FRAME.unpack(self.receive_exactly(FRAME.size))
+        return self.receive_exactly(size)
+
+    def receive_exactly(self, size):
+        chunks = []
+        while size:
+            chunk = self.socket.recv(min(size, 1 << 20))
+            if not chunk:
+                raise ConnectionError("Service closed the connection")
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def tokenize(self, text, fn='<service>'):
+        self.send(text)
+        return decode_tokens(self.receive(), fn, text)
+
+    def tokenize_many(self, texts, fn='<service>'):
+        # Sends every request before reading, so the service can batch them
+        for text in texts:
+            self.send(text)
+        return [decode_tokens(self.receive(), fn, text) for text in texts]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local tokenization service for the Lab_3 lexer")
+    parser.add_argument('--unix', metavar='PATH', help="listen on a Unix socket instead of TCP")
+    parser.add_argument('--port', type=int, default=0, help="TCP port on 127.0.0.1, 0 picks a free one")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.unix, '127.0.0.1', args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
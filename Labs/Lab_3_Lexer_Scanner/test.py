@@ -1,8 +1,20 @@
+import codecs
+import multiprocessing
+import os
 import re  # Importing regular expression library
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+
+from lexer_generator import load_tables
 
 # CONSTANTS
 DIGITS = '0123456789'
 KEYWORDS = {'if', 'while', 'return'}
+# Words that are not identifiers, with the token type each one gets
+RESERVED_WORDS = {keyword: 'KEYWORD' for keyword in KEYWORDS}
+RESERVED_WORDS['char'] = 'CHAR'
 
 
 # ERRORS
@@ -27,6 +39,8 @@ class IllegalCharError(Error):
 
 # POSITION
 class Position:
+    __slots__ = ('idx', 'ln', 'col', 'fn', 'ftxt')
+
     def __init__(self, idx, ln, col, fn, ftxt):
         self.idx = idx
         self.ln = ln  # Line number
@@ -50,6 +64,8 @@ class Position:
 
 # TOKENS
 class Token:
+    __slots__ = ('type', 'value')
+
     def __init__(self, type_, value=None):
         self.type = type_
         self.value = value
@@ -59,6 +75,43 @@ class Token:
         return f'{self.type}'
 
 
+# SYMBOLS
+class Symbol(int):
+    # Value of an IDENTIFIER token: compares and hashes as its integer ID, prints as its name
+    def __new__(cls, symbol_id, name):
+        symbol = super().__new__(cls, symbol_id)
+        symbol.name = name
+        return symbol
+
+    def __repr__(self):
+        return self.name
+
+    __str__ = __repr__
+
+
+class SymbolTable:
+    # Identifiers interned to Symbols numbered from 1 in order of first appearance, so every use of
+    # a name shares one object. IDs belong to the table: lex several inputs with one table to
+    # compare their identifiers. words holds the (token type, value) of each word seen, reserved
+    # words included, so classifying a scanned word is one dictionary lookup.
+    def __init__(self):
+        self.names = [None]
+        self.words = {word: (token_type, word) for word, token_type in RESERVED_WORDS.items()}
+
+    def __len__(self):
+        return len(self.names) - 1
+
+    def __getitem__(self, symbol_id):
+        return self.words[self.names[symbol_id]][1]
+
+    def word(self, word):
+        entry = self.words.get(word)
+        if entry is None:
+            entry = self.words[word] = (TT_IDENTIFIER, Symbol(len(self.names), word))
+            self.names.append(word)
+        return entry
+
+
 # Token types
 TT_INT = 'INT'
 TT_FLOAT = 'FLOAT'
@@ -118,217 +171,629 @@ TOKEN_PATTERNS = {
 }
 
 
+# Fast mode: the token patterns joined into one alternation, tried in order, so a longer token
+# has to come before its prefix ('<=' before '<'). Where the lexer differs from TOKEN_PATTERNS
+# (numbers, strings, comments, reserved words, '==' lexed as two ASSIGN) the pattern follows the lexer.
+FAST_PATTERNS = [
+    ('SKIP', r'[ \t]+|//[^\n]*\n?|/\*[\s\S]*?\*/'),
+    ('OPEN_COMMENT', r'/\*[\s\S]*\Z'),  # a /* comment without its closing */
+    ('NUMBER', r'\d[\d.]*'),
+    (TT_STRING, r'"((?:[^"\\]|\\[\s\S])*)(?:"|\\?\Z)'),  # the inner group is the body
+    (TT_IDENTIFIER, TOKEN_PATTERNS[TT_IDENTIFIER]),  # reserved words are told apart by RESERVED_WORDS
+    (TT_LESS_EQUAL, TOKEN_PATTERNS[TT_LESS_EQUAL]),
+    (TT_GREATER_EQUAL, TOKEN_PATTERNS[TT_GREATER_EQUAL]),
+] + [(token_type, TOKEN_PATTERNS[token_type]) for token_type in (
+    TT_PLUS, TT_MINUS, TT_MUL, TT_DIV, TT_LPAREN, TT_RPAREN, TT_COMMA, TT_ASSIGN, TT_LESS, TT_GREATER,
+    TT_NEWLINE, TT_COLON, TT_SEMICOLON, TT_LBRACE, TT_RBRACE
+)] + [
+    ('ILLEGAL', r'[\s\S]'),
+]
+# Blanks before a token are absorbed into its match, which halves the number of matches
+FAST_REGEX = re.compile('[ \t]*(?:' + '|'.join(f'(?P<{name}>{pattern})' for name, pattern in FAST_PATTERNS) + ')')
+FAST_SIMPLE_TOKENS = {name for name, _ in FAST_PATTERNS} - {'SKIP', 'OPEN_COMMENT', 'NUMBER', TT_STRING,
+                                                            TT_IDENTIFIER, 'ILLEGAL'}
+FAST_STRING_BODY = FAST_REGEX.groupindex[TT_STRING] + 1
+STRING_ESCAPE_REGEX = re.compile(r'\\([\s\S])')
+STRING_BODY_REGEX = re.compile(dict(FAST_PATTERNS)[TT_STRING])
+STRING_REST_REGEX = re.compile(r'(?:[^"\\]|\\[\s\S])*')  # more of an open string's body, up to its quote
+ESCAPE_CHARACTERS = {
+    'n': '\n',
+    't': '\t'
+}
+
+# Table-driven lexer: the token patterns in priority order, compiled by lexer_generator into one
+# minimized DFA and run with maximal munch. Where the lexer differs from TOKEN_PATTERNS the spec
+# follows it, as FAST_PATTERNS does; the unterminated forms only win at the end of the input,
+# because anywhere else the closed form is longer.
+LEXER_SPEC = [
+    ('SKIP', r'[ \t]+|//[^\n]*\n?|/\*([^*]|\*+[^*/])*\*+/'),
+    ('OPEN_COMMENT', r'/\*([^*]|\*+[^*/])*\**'),
+    ('NUMBER', r'\d[\d.]*'),
+    (TT_STRING, r'"([^"\\]|\\[\s\S])*"'),
+    (TT_STRING, r'"([^"\\]|\\[\s\S])*\\?'),  # unterminated, up to the end of the input
+    (TT_IDENTIFIER, TOKEN_PATTERNS[TT_IDENTIFIER]),  # reserved words are told apart by RESERVED_WORDS
+] + [(token_type, TOKEN_PATTERNS[token_type]) for token_type in (
+    TT_LESS_EQUAL, TT_GREATER_EQUAL, TT_PLUS, TT_MINUS, TT_MUL, TT_DIV, TT_LPAREN, TT_RPAREN, TT_COMMA, TT_ASSIGN,
+    TT_LESS, TT_GREATER, TT_NEWLINE, TT_COLON, TT_SEMICOLON, TT_LBRACE, TT_RBRACE
+)]
+LEXER_KINDS = {index: kind for index, (kind, _) in enumerate(LEXER_SPEC)}
+LEXER_KINDS[-1] = 'ILLEGAL'
+LEXER_TABLES = None
+
+
+# Tables for LEXER_SPEC, from the on-disk cache when it has them
+def lexer_tables():
+    global LEXER_TABLES
+    if LEXER_TABLES is None:
+        LEXER_TABLES = load_tables(LEXER_SPEC)
+    return LEXER_TABLES
+
+
+# Compact token stream: type codes and offsets in parallel arrays
+TOKEN_TYPES = [TT_INT, TT_FLOAT, TT_PLUS, TT_MINUS, TT_MUL, TT_DIV, TT_LPAREN, TT_RPAREN, TT_IDENTIFIER,
+               TT_STRING, TT_COMMA, TT_ASSIGN, TT_LESS, TT_GREATER, TT_LESS_EQUAL, TT_GREATER_EQUAL, TT_CHAR,
+               TT_EOF, TT_NEWLINE, TT_COLON, TT_KEYWORD, TT_SEMICOLON, TT_LBRACE, TT_RBRACE]
+TYPE_CODES = {token_type: code for code, token_type in enumerate(TOKEN_TYPES)}
+SCAN_CODES = {kind: TYPE_CODES[kind] for kind in FAST_SIMPLE_TOKENS | {TT_STRING}}
+SCAN_WORDS = {word: TYPE_CODES[token_type] for word, token_type in RESERVED_WORDS.items()}
+SCAN_IDENTIFIER = TYPE_CODES[TT_IDENTIFIER]
+SCAN_INT, SCAN_FLOAT = TYPE_CODES[TT_INT], TYPE_CODES[TT_FLOAT]
+
+
+def escape_string(body):
+    return STRING_ESCAPE_REGEX.sub(lambda escape: ESCAPE_CHARACTERS.get(escape.group(1), escape.group(1)), body)
+
+
+# Sorted offset arrays whose entries from index moved on are still to be moved by delta
+def moved_offset(offsets, i, moved, delta):
+    offset = offsets[i]
+    if i < 0:
+        i += len(offsets)
+    return offset + delta if i >= moved else offset
+
+
+def bisect_moved(offsets, moved, delta, idx, bisect=bisect_left):
+    i = bisect(offsets, idx, 0, moved)
+    return i if i < moved else bisect(offsets, idx - delta, moved)
+
+
+def shift_offsets(offsets, start, end, delta):
+    if start < end and delta:
+        offsets[start:end] = array(offsets.typecode, map(delta.__add__, offsets[start:end]))
+
+
+class TokenStream:
+    def __init__(self, fn, text, symbols=None):
+        self.fn = fn
+        self.text = text
+        self.symbols = symbols if symbols is not None else SymbolTable()  # interns identifiers on access
+        offset = 'i' if len(text) < 2 ** 31 else 'q'
+        self.types = array('B')
+        self.starts = array(offset)
+        self.ends = array(offset)
+        self.error_ends = array(offset)  # the illegal character of each error is just before its end
+        self.line_starts = None  # built on the first position lookup
+        # relex stores the offsets after an edit unmoved: starts and ends from index moved_tokens
+        # on, error_ends from moved_errors and line_starts from moved_lines are read plus delta
+        self.delta = 0
+        self.moved_tokens = self.moved_errors = self.moved_lines = 0
+
+    def __len__(self):
+        return len(self.types)
+
+    def __getitem__(self, i):
+        return Token(TOKEN_TYPES[self.types[i]], self.value(i))
+
+    def __iter__(self):
+        for i in range(len(self.types)):
+            yield self[i]
+
+    def type(self, i):
+        return TOKEN_TYPES[self.types[i]]
+
+    def start(self, i):
+        return moved_offset(self.starts, i, self.moved_tokens, self.delta)
+
+    def end(self, i):
+        return moved_offset(self.ends, i, self.moved_tokens, self.delta)
+
+    # Source text the token was scanned from
+    def lexeme(self, i):
+        return self.text[self.start(i):self.end(i)]
+
+    # Token value, converted from the source text only when asked for
+    def value(self, i):
+        token_type = TOKEN_TYPES[self.types[i]]
+        if token_type == TT_IDENTIFIER:
+            return self.symbols.word(self.lexeme(i))[1]
+        if token_type in (TT_KEYWORD, TT_CHAR):
+            return self.lexeme(i)
+        if token_type == TT_INT:
+            return int(self.lexeme(i))
+        if token_type == TT_FLOAT:
+            return float(self.lexeme(i))
+        if token_type == TT_STRING:
+            return escape_string(STRING_BODY_REGEX.match(self.text, self.start(i), self.end(i)).group(1))
+        return None
+
+    # Line and column of an offset, by bisecting the line starts
+    def position(self, idx):
+        if self.line_starts is None:
+            line_starts = array(self.starts.typecode, [0])
+            text = self.text
+            newline = text.find('\n')
+            while newline != -1:
+                line_starts.append(newline + 1)
+                newline = text.find('\n', newline + 1)
+            self.line_starts = line_starts
+            self.moved_lines = len(line_starts)
+        ln = bisect_moved(self.line_starts, self.moved_lines, self.delta, idx, bisect_right) - 1
+        line_start = moved_offset(self.line_starts, ln, self.moved_lines, self.delta)
+        return Position(idx, ln, idx - line_start, self.fn, self.text)
+
+    def tokens(self):
+        return list(self)
+
+    def error(self, i):
+        end = moved_offset(self.error_ends, i, self.moved_errors, self.delta)
+        return IllegalCharError(self.position(end - 1), self.position(end), "'" + self.text[end - 1] + "'")
+
+    def errors(self):
+        return StreamErrors(self)
+
+    # Moves the stored offsets for code that reads the arrays directly; costs one pass over them
+    def settle(self):
+        for offsets, moved in ((self.starts, self.moved_tokens), (self.ends, self.moved_tokens),
+                               (self.error_ends, self.moved_errors), (self.line_starts, self.moved_lines)):
+            if offsets is not None:
+                shift_offsets(offsets, moved, len(offsets), self.delta)
+        self.delta = 0
+
+    # Appends the tokens of self.text from offset start. When relexing, old is the stream before
+    # the edit: scanning stops at the first token end at or after edit_end that old also had as a
+    # token end (moved by delta), because from there the text and so the tokens are the same, and
+    # that offset in the old text is returned. Otherwise the EOF token is appended.
+    def scan(self, start, old=None, delta=0, edit_end=0):
+        text = self.text
+        types_append = self.types.append
+        starts_append = self.starts.append
+        ends_append = self.ends.append
+
+        for match in FAST_REGEX.finditer(text, start):
+            kind = match.lastgroup
+            if kind == 'SKIP':
+                continue
+            start, end = match.span(kind)
+            if kind == TT_IDENTIFIER:
+                code = SCAN_WORDS.get(match.group(kind), SCAN_IDENTIFIER)
+            elif kind == 'NUMBER':
+                value = match.group(kind)
+                if value.count('.') > 1:
+                    float(value)  # raises the ValueError make_tokens does for '1.2.3'
+                code = SCAN_FLOAT if '.' in value else SCAN_INT
+            elif kind == 'OPEN_COMMENT':
+                raise Exception("Unterminated multi-line comment")
+            else:
+                if kind == 'ILLEGAL':
+                    self.error_ends.append(end)
+                    continue
+                code = SCAN_CODES[kind]
+            types_append(code)
+            starts_append(start)
+            ends_append(end)
+            if old is not None and end >= edit_end:
+                i = bisect_moved(old.ends, old.moved_tokens, old.delta, end - delta)
+                if end == delta or i < len(old.ends) and old.end(i) == end - delta:
+                    return end - delta
+
+        types_append(TYPE_CODES[TT_EOF])
+        starts_append(len(text))
+        ends_append(len(text))
+        return None
+
+
+class StreamErrors(Sequence):
+    # The errors of a TokenStream, each IllegalCharError made when it is read, so that getting
+    # the errors costs nothing until they are looked at
+    def __init__(self, stream):
+        self.stream = stream
+
+    def __len__(self):
+        return len(self.stream.error_ends)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.stream.error(j) for j in range(*i.indices(len(self)))]
+        return self.stream.error(i)
+
+
+# PROFILING
+class LexerProfile:
+    # Optional hook for Lexer.make_tokens: per branch of its if/elif chain and per token type, the
+    # number of matches, the time the tables took to find them (scan) and the time the branch took
+    # to turn them into tokens (handle). The wrapper times around each yield, so make_tokens itself
+    # is unchanged and costs nothing extra when no profile is given. Timing every token is slower
+    # than lexing it, so compare shares between rows rather than totals with unprofiled runs.
+    def __init__(self):
+        self.branches = {}  # branch -> [count, scan_ns, handle_ns]
+        self.token_types = {}
+
+    def wrap(self, matches, text):
+        clock = time.perf_counter_ns
+        matches = iter(matches)
+        while True:
+            started = clock()
+            match = next(matches, None)
+            found = clock()
+            if match is None:
+                return
+            yield match
+            handled = clock()
+            tag, start, end = match
+            branch, token_type = self.classify(LEXER_KINDS[tag], text[start:end])
+            for table, key in ((self.branches, branch), (self.token_types, token_type)):
+                row = table.get(key)
+                if row is None:
+                    row = table[key] = [0, 0, 0]
+                row[0] += 1
+                row[1] += found - started
+                row[2] += handled - found
+
+    @staticmethod
+    def classify(kind, lexeme):
+        if kind in FAST_SIMPLE_TOKENS:
+            return 'simple', kind
+        if kind == TT_IDENTIFIER:
+            return kind, RESERVED_WORDS.get(lexeme, TT_IDENTIFIER)
+        if kind == 'NUMBER':
+            return kind, TT_FLOAT if '.' in lexeme else TT_INT
+        if kind == TT_STRING:
+            return kind, TT_STRING
+        return kind, kind  # SKIP, OPEN_COMMENT and ILLEGAL make no token and are listed by branch name
+
+    def report(self):
+        # Rows of (name, count, scan seconds, handle seconds), slowest first
+        return {title: sorted(((name, count, scan / 1e9, handle / 1e9) for name, (count, scan, handle) in table.items()),
+                              key=lambda row: row[2] + row[3], reverse=True)
+                for title, table in (('branches', self.branches), ('token_types', self.token_types))}
+
+
 # LEXER converting input text into tokens
 class Lexer:
-    def __init__(self, fn, text):
+    def __init__(self, fn, text, symbols=None, profile=None):
         self.fn = fn
         self.text = text  # Input text
-        self.pos = Position(-1, 0, -1, fn, text)  # Starting position
-        self.current_char = None
-        self.advance()  # Move to the first character
-
-    def advance(self):
-        self.pos.advance(self.current_char)  # Move to the next position
-        self.current_char = self.text[self.pos.idx] if self.pos.idx < len(
-            self.text) else None  # Update current character
-
-    def skip_comment(self):
-        if self.current_char == '/':
-            self.advance()
-            if self.current_char == '/':
-                # Single-line comment, skip until the end of line
-                while self.current_char and self.current_char != '\n':
-                    self.advance()
-                self.advance()  # Move past the newline character
-            elif self.current_char == '*':
-                # Multi-line comment, skip until '*/'
-                depth = 1
-                self.advance()  # Move past the '*' character
-                while depth > 0:
-                    if self.current_char == '*' and self.peek() == '/':
-                        depth -= 1
-                        self.advance()
-                        self.advance()  # Move past the '*' and '/' characters
-                    elif self.current_char == '\n':
-                        self.advance()  # Move past the newline character
-                    elif self.current_char:
-                        self.advance()  # Move past other characters inside comments
-                    else:
-                        raise Exception("Unterminated multi-line comment")
-            else:
-                # This is not a comment, rewind to the previous character
-                self.pos.advance(self.current_char)
+        self.symbols = symbols if symbols is not None else SymbolTable()  # Identifiers seen so far
+        self.profile = profile  # LexerProfile filled in by make_tokens, None to skip the timing
 
-# convert input text into tokens
+# convert input text into tokens: the longest match of the LEXER_SPEC tables at each point
     def make_tokens(self):
         tokens = []
         errors = []
-
-# Skips whitespace
-        while self.current_char is not None:
-            # Ignore whitespace characters
-            if self.current_char in ' \t':
-                self.advance()
-            # handle Numeric tokens
-            elif re.match(r'\d', self.current_char):
-                tokens.append(self.make_number())
-            # Operator tokens
-            elif self.current_char == '+':
-                tokens.append(Token(TT_PLUS))
-                self.advance()
-            elif self.current_char == '-':
-                tokens.append(Token(TT_MINUS))
-                self.advance()
-            elif self.current_char == '*':
-                tokens.append(Token(TT_MUL))
-                self.advance()
-            elif self.current_char == '/':
-                # Handling comments
-                if self.peek() == '/':
-                    self.skip_comment()
-                else:
-                    tokens.append(Token(TT_DIV))
-                    self.advance()
-            # Parentheses and punctuation tokens
-            elif self.current_char == '(':
-                tokens.append(Token(TT_LPAREN))
-                self.advance()
-            elif self.current_char == ')':
-                tokens.append(Token(TT_RPAREN))
-                self.advance()
-            elif self.current_char == ',':
-                tokens.append(Token(TT_COMMA))
-                self.advance()
-            elif self.current_char == '=':
-                tokens.append(Token(TT_ASSIGN))
-                self.advance()
-            elif self.current_char == '<':
-                self.advance()
-                if self.current_char == '=':
-                    tokens.append(Token(TT_LESS_EQUAL))
-                    self.advance()
-                else:
-                    tokens.append(Token(TT_LESS))
-            elif self.current_char == '>':
-                self.advance()
-                if self.current_char == '=':
-                    tokens.append(Token(TT_GREATER_EQUAL))
-                    self.advance()
-                else:
-                    tokens.append(Token(TT_GREATER))
-            elif self.current_char == '"':
-                tokens.append(self.make_string())
-            elif self.current_char == 'c':
-                tokens.append(self.make_char(errors))
-            # Newline and punctuation tokens
-            elif self.current_char == '\n':
-                tokens.append(Token(TT_NEWLINE))
-                self.advance()
-
-            elif self.current_char == ':':
-                tokens.append(Token(TT_COLON))
-                self.advance()
-            elif self.current_char == ';':
-                tokens.append(Token(TT_SEMICOLON))
-                self.advance()
-            elif self.current_char == '{':
-                tokens.append(Token(TT_LBRACE))
-                self.advance()
-            elif self.current_char == '}':
-                tokens.append(Token(TT_RBRACE))
-                self.advance()
-            # Identifiers
-            elif re.match(r'[a-zA-Z_]', self.current_char):
-                tokens.append(self.make_identifier())
-            # Handling illegal characters
+        text = self.text
+        line = 0
+        line_start = 0
+        counted = 0
+
+        def position(idx):
+            nonlocal line, line_start, counted
+            newlines = text.count('\n', counted, idx)
+            if newlines:
+                line += newlines
+                line_start = text.rindex('\n', counted, idx) + 1
+            counted = idx
+            return Position(idx, line, idx - line_start, self.fn, text)
+
+        append = tokens.append
+        word = self.symbols.word
+        matches = lexer_tables().scan(text)
+        if self.profile is not None:
+            matches = self.profile.wrap(matches, text)
+        for tag, start, end in matches:
+            kind = LEXER_KINDS[tag]
+            if kind in FAST_SIMPLE_TOKENS:
+                append(Token(kind))
+            elif kind == 'SKIP':
+                continue
+            elif kind == TT_IDENTIFIER:
+                append(Token(*word(text[start:end])))
+            elif kind == 'NUMBER':
+                value = text[start:end]
+                append(Token(TT_FLOAT, float(value)) if '.' in value else Token(TT_INT, int(value)))
+            elif kind == TT_STRING:
+                append(Token(TT_STRING, escape_string(STRING_BODY_REGEX.match(text, start, end).group(1))))
+            elif kind == 'OPEN_COMMENT':
+                raise Exception("Unterminated multi-line comment")
             else:
-                pos_start = self.pos.copy()
-                char = self.current_char
-                self.advance()
-                errors.append(IllegalCharError(pos_start, self.pos, "'" + char + "'"))
+                errors.append(IllegalCharError(position(end - 1), position(end), "'" + text[end - 1] + "'"))
 
-        tokens.append(Token(TT_EOF))  # Adding end of file token
+        append(Token(TT_EOF))  # Adding end of file token
         return tokens, errors
 
-    # Creates a numeric token.
-    def make_number(self):
-        num_str = ''
-
-        while self.current_char is not None and re.match(r'\d|\.', self.current_char):
-            num_str += self.current_char
-            self.advance()
-
-        if '.' in num_str:
-            return Token(TT_FLOAT, float(num_str))
-        else:
-            return Token(TT_INT, int(num_str))
-
-    # Creates a string token.
-    def make_string(self):
-        string = ''
-        escape_character = False
-        self.advance()
-
-        escape_characters = {
-            'n': '\n',
-            't': '\t'
-        }
-
-        while self.current_char is not None and (self.current_char != '"' or escape_character):
-            if escape_character:
-                string += escape_characters.get(self.current_char, self.current_char)
-                escape_character = False
-            else:
-                if self.current_char == '\\':
-                    escape_character = True
+    # Same tokens and errors as make_tokens, from one regex scan instead of per-character calls
+    def make_tokens_fast(self):
+        errors = []
+        tokens = list(self.scan_chunks((self.text,), errors))
+        return tokens, errors
+
+    # Same scan as make_tokens_fast, but the tokens go into a TokenStream and values are left in the text
+    def make_token_stream(self):
+        stream = TokenStream(self.fn, self.text, self.symbols)
+        stream.scan(0)
+        return stream, stream.errors()
+
+    # Lazily lexes a file object or mmap chunk by chunk, appending errors to the given list as it goes
+    def make_tokens_stream(self, source, errors, chunk_size=1 << 16):
+        return self.scan_chunks(read_chunks(source, chunk_size), errors)
+
+    # Runs FAST_REGEX over each chunk. A match that reaches the end of the buffer may still grow
+    # (a number, '<' before '='), so it is carried into the next chunk and only the tail after the
+    # last complete token is kept. Blanks there are dropped, an open /* or // comment is skipped
+    # without keeping its text, and an open string keeps only its body so far: each chunk is
+    # searched once for what closes them.
+    def scan_chunks(self, chunks, errors):
+        buffer = ''
+        base = 0  # offset of buffer[0] in the whole input
+        line = 0
+        line_start = 0
+        counted = 0
+        in_comment = False
+        in_line_comment = False
+        string_body = None  # body pieces of the open string, None outside one
+        word = self.symbols.word
+
+        def count_lines(idx):
+            nonlocal line, line_start, counted
+            newlines = buffer.count('\n', counted - base, idx - base)
+            if newlines:
+                line += newlines
+                line_start = base + buffer.rindex('\n', counted - base, idx - base) + 1
+            counted = idx
+
+        def position(idx):
+            count_lines(idx)
+            return Position(idx, line, idx - line_start, self.fn, self.text)
+
+        chunks = iter(chunks)
+        chunk = next(chunks, '')
+        while chunk is not None:
+            following = next(chunks, None)
+            at_end = following is None
+            buffer += chunk
+            if in_comment:
+                close = buffer.find('*/')
+                if close == -1:
+                    if at_end:
+                        raise Exception("Unterminated multi-line comment")
+                    keep = len(buffer) - 1 if buffer.endswith('*') else len(buffer)
+                    count_lines(base + keep)
+                    buffer, base = buffer[keep:], base + keep
+                    chunk = following
+                    continue
+                count_lines(base + close + 2)
+                buffer, base = buffer[close + 2:], base + close + 2
+                in_comment = False
+            elif in_line_comment:
+                newline = buffer.find('\n')
+                if newline == -1:
+                    count_lines(base + len(buffer))
+                    buffer, base = '', base + len(buffer)
+                    chunk = following
+                    continue
+                count_lines(base + newline + 1)
+                buffer, base = buffer[newline + 1:], base + newline + 1
+                in_line_comment = False
+            elif string_body is not None:
+                body_end = STRING_REST_REGEX.match(buffer).end()
+                closed = body_end < len(buffer) and buffer[body_end] == '"'
+                string_body.append(buffer[:body_end])
+                if not closed and not at_end:
+                    # a trailing backslash stays in the buffer with whatever it escapes
+                    count_lines(base + body_end)
+                    buffer, base = buffer[body_end:], base + body_end
+                    chunk = following
+                    continue
+                yield Token(TT_STRING, escape_string(''.join(string_body)))
+                string_body = None
+                skip = body_end + 1 if closed else len(buffer)  # an unterminated one ends the input
+                count_lines(base + skip)
+                buffer, base = buffer[skip:], base + skip
+
+            consumed = 0
+            size = len(buffer)
+            for match in FAST_REGEX.finditer(buffer):
+                kind = match.lastgroup
+                if match.end() == size and not at_end:
+                    if kind == 'OPEN_COMMENT':
+                        # keep a trailing '*' unless it is the one opening the comment
+                        consumed = size - 1 if buffer.endswith('*') and match.start(kind) + 2 < size else size
+                        in_comment = True
+                    elif kind == 'SKIP':
+                        # nothing after blanks or a comment can join them, a // comment just goes on
+                        consumed = size
+                        in_line_comment = match.group(kind).startswith('//') and not buffer.endswith('\n')
+                    elif kind == TT_STRING and buffer[match.end(FAST_STRING_BODY):] in ('', '\\'):
+                        # the body so far is kept, a trailing backslash is read again with the next chunk
+                        consumed = match.end(FAST_STRING_BODY)
+                        string_body = [match.group(FAST_STRING_BODY)]
+                    break
+                consumed = match.end()
+                if kind in FAST_SIMPLE_TOKENS:
+                    yield Token(kind)
+                    continue
+                if kind == 'SKIP':
+                    continue
+                value = match.group(kind)
+                if kind == TT_IDENTIFIER:
+                    yield Token(*word(value))
+                elif kind == 'NUMBER':
+                    yield Token(TT_FLOAT, float(value)) if '.' in value else Token(TT_INT, int(value))
+                elif kind == TT_STRING:
+                    yield Token(TT_STRING, escape_string(match.group(FAST_STRING_BODY)))
+                elif kind == 'OPEN_COMMENT':
+                    raise Exception("Unterminated multi-line comment")
                 else:
-                    string += self.current_char
-            self.advance()
-
-        self.advance()  # Closing quote
-        return Token(TT_STRING, string)
-
-    #   Creates a character token.
-    def make_char(self, errors):
-        char = 'c'
-        self.advance()
-        if self.current_char == 'h':
-            char += 'h'
-            self.advance()
-            if self.current_char == 'a':
-                char += 'a'
-                self.advance()
-                if self.current_char == 'r':
-                    char += 'r'
-                    self.advance()
-                    return Token(TT_CHAR, char)
-
-        pos_start = self.pos.copy()
-        char = self.current_char
-        self.advance()
-        errors.append(IllegalCharError(pos_start, self.pos, "'" + char + "'"))
-
-    # Creates an identifier token.
-    def make_identifier(self):
-        id_str = ''
-        while self.current_char is not None and re.match(r'[a-zA-Z0-9_]', self.current_char):
-            id_str += self.current_char
-            self.advance()
-        if id_str in KEYWORDS:
-            return Token(TT_KEYWORD, id_str)
-        return Token(TT_IDENTIFIER, id_str)
-
-    # Peeks at the next character.
-    def peek(self):
-        peek_pos = self.pos.idx + 1
-        if peek_pos < len(self.text):
-            return self.text[peek_pos]
-        return None
+                    end = base + consumed
+                    errors.append(IllegalCharError(position(end - 1), position(end), "'" + buffer[consumed - 1] + "'"))
+
+            count_lines(base + consumed)
+            buffer, base = buffer[consumed:], base + consumed
+            chunk = following
+
+        yield Token(TT_EOF)
 
 
 # RUN
-def run(fn, text):
-    lexer = Lexer(fn, text)
-    tokens, errors = lexer.make_tokens()
+def run(fn, text, fast=False, symbols=None):
+    lexer = Lexer(fn, text, symbols)
+    tokens, errors = lexer.make_tokens_fast() if fast else lexer.make_tokens()
     return tokens, errors
 
+
+# Tokens as a TokenStream instead of a list of Token objects
+def run_compact(fn, text, symbols=None):
+    return Lexer(fn, text, symbols).make_token_stream()
+
+
+# Lexes pieces of the input on all cores and joins them into one TokenStream. text_or_path is
+# source text, or a file to read when it is an os.PathLike such as pathlib.Path. The pieces are
+# cut after newlines that FAST_REGEX would lex as NEWLINE tokens, so every piece lexes exactly as
+# it does inside the whole text.
+def run_parallel(fn, text_or_path, workers=None, min_piece=1 << 16, symbols=None):
+    text = text_or_path
+    if isinstance(text, os.PathLike):
+        with open(text, encoding='utf-8') as f:
+            text = f.read()
+    workers = workers or os.cpu_count()
+    cuts = split_points(text, min(workers, len(text) // min_piece))
+    if not cuts:
+        return run_compact(fn, text, symbols)
+
+    stream = TokenStream(fn, text, symbols)
+    typecode = stream.starts.typecode
+    bounds = [0] + cuts + [len(text)]
+    jobs = [(fn, text[start:end], start, typecode) for start, end in zip(bounds, bounds[1:])]
+    with multiprocessing.Pool(min(workers, len(jobs))) as pool:
+        for types, starts, ends, error_ends in pool.imap(lex_piece, jobs):  # errors raise in text order
+            stream.types += types
+            stream.starts += starts
+            stream.ends += ends
+            stream.error_ends += error_ends
+    stream.types.append(TYPE_CODES[TT_EOF])
+    stream.starts.append(len(text))
+    stream.ends.append(len(text))
+    return stream, stream.errors()
+
+
+# Quick pre-scan for run_parallel: only what can hide a newline, strings and comments
+SPLIT_REGEX = re.compile('|'.join([
+    dict(FAST_PATTERNS)[TT_STRING], r'/\*[\s\S]*?\*/', r'/\*[\s\S]*\Z', r'//[^\n]*\n?', r'(?P<NEWLINE>\n)'
+]))
+
+
+# Offsets just after a NEWLINE token, one near each of the parts - 1 evenly spaced targets
+def split_points(text, parts):
+    cuts = []
+    if parts < 2:
+        return cuts
+    step = len(text) // parts
+    target = step
+    for match in SPLIT_REGEX.finditer(text):
+        if match.start() >= target and match.lastgroup == TT_NEWLINE:
+            cuts.append(match.end())
+            if len(cuts) == parts - 1:
+                break
+            target = max(target + step, match.end())
+    return cuts
+
+
+# Pool worker for run_parallel: a piece's arrays with offsets moved to where the piece starts
+def lex_piece(job):
+    fn, text, base, typecode = job
+    stream = TokenStream(fn, text)
+    stream.scan(0)
+    del stream.types[-1], stream.starts[-1], stream.ends[-1]  # the piece's own EOF
+    return (stream.types,) + tuple(array(typecode, map(base.__add__, offsets))
+                                   for offsets in (stream.starts, stream.ends, stream.error_ends))
+
+
+# Incremental relexing: the tokens of stream.text after replacing deleted characters at offset
+# with inserted. Tokens ending before the edit are kept, scanning restarts after the last of them
+# and stops as soon as a token ends where an old one did; the old tokens after that are reused
+# with their offsets moved. An edit inside a comment or string rescans just that one match.
+# The reused offsets are copied as they are and only read moved (see TokenStream.delta), so an
+# edit costs the rescan plus the offsets between it and the previous edit, and errors are only
+# made when read.
+def relex(stream, offset, deleted, inserted):
+    text = ''.join((stream.text[:offset], inserted, stream.text[offset + deleted:]))
+    delta = len(inserted) - deleted
+    new = TokenStream(stream.fn, text, stream.symbols)
+    if new.starts.typecode != stream.starts.typecode:
+        return Lexer(stream.fn, text, stream.symbols).make_token_stream()
+
+    old_delta = stream.delta
+    keep = bisect_moved(stream.ends, stream.moved_tokens, old_delta, offset)
+    restart = stream.end(keep - 1) if keep else 0
+    kept_errors = bisect_moved(stream.error_ends, stream.moved_errors, old_delta, restart, bisect_right)
+    new.types = stream.types[:keep]
+    new.starts = stream.starts[:keep]
+    new.ends = stream.ends[:keep]
+    new.error_ends = stream.error_ends[:kept_errors]
+    # kept offsets that were still to be moved are moved now
+    shift_offsets(new.starts, stream.moved_tokens, keep, old_delta)
+    shift_offsets(new.ends, stream.moved_tokens, keep, old_delta)
+    shift_offsets(new.error_ends, stream.moved_errors, kept_errors, old_delta)
+    synced = new.scan(restart, stream, delta, offset + len(inserted))
+
+    # Every reused offset is read plus new.delta, so the ones stream read unmoved are stored minus
+    # its delta
+    new.delta = old_delta + delta
+    new.moved_tokens = moved = len(new.types)
+    new.moved_errors = moved_errors = len(new.error_ends)
+    if synced is not None:
+        resume = bisect_moved(stream.starts, stream.moved_tokens, old_delta, synced)
+        new.types += stream.types[resume:]
+        new.starts += stream.starts[resume:]
+        new.ends += stream.ends[resume:]
+        shift_offsets(new.starts, moved, moved + stream.moved_tokens - resume, -old_delta)
+        shift_offsets(new.ends, moved, moved + stream.moved_tokens - resume, -old_delta)
+        later = bisect_moved(stream.error_ends, stream.moved_errors, old_delta, synced, bisect_right)
+        new.error_ends += stream.error_ends[later:]
+        shift_offsets(new.error_ends, moved_errors, moved_errors + stream.moved_errors - later, -old_delta)
+
+    if stream.line_starts is not None:
+        # lines starting up to the edit stay, the inserted text adds its own, later ones move
+        line_starts = stream.line_starts
+        first = bisect_moved(line_starts, stream.moved_lines, old_delta, offset, bisect_right)
+        new.line_starts = line_starts[:first]
+        shift_offsets(new.line_starts, stream.moved_lines, first, old_delta)
+        newline = inserted.find('\n')
+        while newline != -1:
+            new.line_starts.append(offset + newline + 1)
+            newline = inserted.find('\n', newline + 1)
+        later = bisect_moved(line_starts, stream.moved_lines, old_delta, offset + deleted, bisect_right)
+        new.moved_lines = moved_lines = len(new.line_starts)
+        new.line_starts += line_starts[later:]
+        shift_offsets(new.line_starts, moved_lines, moved_lines + stream.moved_lines - later, -old_delta)
+    return new, new.errors()
+
+
+# Tokens come out one at a time while the source is read, errors are appended as they are found
+def run_stream(fn, source, chunk_size=1 << 16, symbols=None):
+    errors = []
+    return Lexer(fn, '', symbols).make_tokens_stream(source, errors, chunk_size), errors
+
+
+# Reads str chunks from a text file, a binary file or an mmap; bytes are decoded incrementally
+# so a UTF-8 character split between two reads stays whole
+def read_chunks(source, chunk_size):
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    while True:
+        data = source.read(chunk_size)
+        if not data:
+            break
+        yield data if isinstance(data, str) else decoder.decode(data)
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
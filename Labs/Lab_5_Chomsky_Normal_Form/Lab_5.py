@@ -1,3 +1,11 @@
+from collections import deque
+from itertools import chain
+
+EPSILON = 'epsilon'
+VOCABULARY = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P', 'Q', 'R', 'S',
+              'T', 'U', 'V', 'W', 'X', 'Y', 'Z']
+
+
 class Grammar:
     def __init__(self):
         self.P = {
@@ -9,146 +17,149 @@ class Grammar:
         }
         self.V_N = ['S', 'A', 'B', 'C', 'D']
         self.V_T = ['a', 'b', 'd']
+        self.S = 'S'
+
+    # Every symbol is one character; it is a non-terminal when it is in V_N or has productions
+    def non_terminals(self):
+        return set(self.V_N) | self.P.keys()
+
+    # Characters free to name new non-terminals: the unused capital letters, then, since more than
+    # 26 can be needed, any other unused character
+    def free_symbols(self):
+        taken = self.non_terminals() | set(self.V_T) | {c for value in self.P.values() for v in value for c in v}
+        return (s for s in chain(VOCABULARY, map(chr, range(0xC0, 0x110000))) if s not in taken and s.isprintable())
+
+    def binarize(self):
+        # Bodies longer than two are split in halves, each half of more than one symbol becoming a
+        # new non-terminal; equal halves share one
+        free_symbols = self.free_symbols()
+        P = {key: [] for key in self.P}
+        introduced = {}
+
+        def introduce(body):
+            if body not in introduced:
+                name = introduced[body] = next(free_symbols)
+                P[name] = [split(body) if len(body) > 2 else body]
+            return introduced[body]
+
+        def split(symbols):
+            half = len(symbols) // 2
+            return ''.join(s if len(s) == 1 else introduce(s) for s in (symbols[:half], symbols[half:]))
 
-    def elim_epsilon(self):
-        nt_epsilon = []
         for key, value in self.P.items():
-            s = key
-            productions = value
-            for p in productions:
-                if p == 'epsilon':
-                    nt_epsilon.append(s)
+            P[key] = [split(v) if len(v) > 2 and v != EPSILON else v for v in value]
+        return P
+
+    # Nullable non-terminals: a rule is nullable once every symbol of its body is, so each rule
+    # counts the body symbols not yet known to be nullable (a terminal never is)
+    def nullable_symbols(self):
+        rules = IndexedRules(self.P, self.non_terminals())
+        return rules.fixpoint([0 if body == EPSILON else len(body) for body in rules.bodies])
+
+    # Productive non-terminals: a rule is productive once every non-terminal of its body is
+    def productive_symbols(self):
+        non_terminals = self.non_terminals()
+        rules = IndexedRules(self.P, non_terminals)
+        return rules.fixpoint([0 if body == EPSILON else sum(symbol in non_terminals for symbol in body)
+                               for body in rules.bodies])
 
+    def elim_epsilon(self):
+        # Long bodies are binarized first, so every body gets at most four copies, one per way of
+        # leaving out its nullable symbols. Bodies that become empty are dropped, and so is a
+        # non-terminal left without productions; the empty word itself is not kept in the language.
+        self.P = self.binarize()
+        nullable = self.nullable_symbols()
+        P1 = {}
         for key, value in self.P.items():
-            for ep in nt_epsilon:
-                for v in value:
-                    prod_copy = v
-                    if ep in prod_copy:
-                        for c in prod_copy:
-                            if c == ep:
-                                value.append(prod_copy.replace(c, ''))
-
-        P1 = self.P.copy()
-        for key, value in self.P.items():
-            if key in nt_epsilon and len(value) < 2:
-                del P1[key]
-            else:
-                for v in value:
-                    if v == 'epsilon':
-                        P1[key].remove(v)
-
-        print(f"1. Eliminating epsilon productions:")
-        for key, value in P1.items():
-            print(f"{key} -> {' | '.join(value)}")
-        print("------------------------------------------------")
-        self.P = P1.copy()
+            bodies = {}
+            for v in value:
+                if v == EPSILON:
+                    continue
+                variants = ['']
+                for c in v:
+                    variants = [p + c for p in variants] + (variants if c in nullable else [])
+                bodies.update(dict.fromkeys(p for p in variants if p))
+            if bodies:
+                P1[key] = list(bodies)
+
+        print_productions("1. Eliminating epsilon productions:", P1)
+        self.P = P1
         return P1
 
     def elim_unit_prod(self):
-        P2 = self.P.copy()
-        for key, value in self.P.items():
-            for v in value:
-                if len(v) == 1 and v in self.V_N:
-                    P2[key].remove(v)
-                    for p in self.P[v]:
-                        P2[key].append(p)
-        print(f"2. Eliminating unit productions:")
-        for key, value in P2.items():
-            print(f"{key} -> {' | '.join(value)}")
-        print("------------------------------------------------")
-        self.P = P2.copy()
+        # A -> B unit edges form a graph; A gets the non-unit bodies of every symbol it reaches
+        non_terminals = self.non_terminals()
+        units = {key: [v for v in value if v in non_terminals] for key, value in self.P.items()}
+        P2 = {}
+        for key in self.P:
+            reached = {key}
+            queue = deque([key])
+            bodies = {}
+            while queue:
+                symbol = queue.popleft()
+                for v in self.P.get(symbol, ()):
+                    if v not in non_terminals:
+                        bodies[v] = None
+                for target in units.get(symbol, ()):
+                    if target not in reached:
+                        reached.add(target)
+                        queue.append(target)
+            P2[key] = list(bodies)
+
+        print_productions("2. Eliminating unit productions:", P2)
+        self.P = P2
         return P2
 
     def elim_inaccesible_symb(self):
-        P3 = self.P.copy()
-        accesible_symbols = self.V_N
-        for key, value in self.P.items():
-            for v in value:
+        # Breadth-first search from the start symbol
+        reached = {self.S}
+        queue = deque([self.S])
+        while queue:
+            for v in self.P.get(queue.popleft(), ()):
                 for s in v:
-                    if s in accesible_symbols:
-                        accesible_symbols.remove(s)
-
-        for el in accesible_symbols:
-            del P3[el]
+                    if s not in reached and s in self.P:
+                        reached.add(s)
+                        queue.append(s)
+        P3 = {key: list(value) for key, value in self.P.items() if key in reached}
 
-        print(f"3. Eliminating inaccessible symbols:")
-        for key, value in P3.items():
-            print(f"{key} -> {' | '.join(value)}")
-        print("------------------------------------------------")
-        self.P = P3.copy()
+        print_productions("3. Eliminating inaccessible symbols:", P3)
+        self.P = P3
         return P3
 
     def elin_unnprod_symb(self):
-        P4 = self.P.copy()
+        non_terminals = self.non_terminals()
+        productive = self.productive_symbols()
+        P4 = {}
         for key, value in self.P.items():
-            count = 0
-            for v in value:
-                if len(v) == 1 and v in self.V_T:
-                    count += 1
-            if count == 0:
-                del P4[key]
-                for k, v in self.P.items():
-                    for e in v:
-                        if k == key:
-                            break
-                        else:
-                            if key in e:
-                                P4[key].remove(e)
+            if key in productive:
+                P4[key] = [v for v in value if all(c in productive or c not in non_terminals for c in v)]
 
-        for key, value in self.P.items():
-            for v in value:
-                for c in v:
-                    if c.isupper() and c not in P4.keys():
-                        P4[key].remove(v)
-                        break
-
-        print(f"4. Eliminating unproductive symbols:")
-        for key, value in P4.items():
-            print(f"{key} -> {' | '.join(value)}")
-        print("------------------------------------------------")
-        self.P = P4.copy()
+        print_productions("4. Eliminating unproductive symbols:", P4)
+        self.P = P4
         return P4
 
     def transf_to_cnf(self):
-        P5 = self.P.copy()
-        temp = {}
-        vocabulary = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P', 'Q', 'R', 'S',
-                      'T', 'U', 'V', 'W', 'X', 'Y', 'Z']
-        free_symbols = [v for v in vocabulary if v not in self.P.keys()]
+        # Bodies are at most two symbols long since elim_epsilon, so only the terminals in
+        # two-symbol bodies need a non-terminal of their own, one per terminal
+        non_terminals = self.non_terminals()
+        free_symbols = self.free_symbols()
+        P5 = {key: [] for key in self.P}
+        introduced = {}
         for key, value in self.P.items():
             for v in value:
-                if (len(v) == 1 and v in self.V_T) or (len(v) == 2 and v.isupper()):
-                    continue
-                else:
-                    left = v[:len(v) // 2]
-                    right = v[len(v) // 2:]
-                    if left in temp.values():
-                        temp_key1 = ''.join([i for i in temp.keys() if temp[i] == left])
-                    else:
-                        temp_key1 = free_symbols.pop(0)
-                        temp[temp_key1] = left
-                    if right in temp.values():
-                        temp_key2 = ''.join([i for i in temp.keys() if temp[i] == right])
-                    else:
-                        temp_key2 = free_symbols.pop(0)
-                        temp[temp_key2] = right
-
-                    P5[key] = [temp_key1 + temp_key2 if item == v else item for item in P5[key]]
-
-        for key, value in temp.items():
-            P5[key] = [value]
-
-        print(f"5. Obtain Chomsky Normal Form(CNF):")
-        for key, value in P5.items():
-            print(f"{key} -> {' | '.join(value)}")
-        print("------------------------------------------------")
+                if len(v) > 1:
+                    for c in v:
+                        if c not in non_terminals and c not in introduced:
+                            name = introduced[c] = next(free_symbols)
+                            P5[name] = [c]
+                    v = ''.join(introduced.get(c, c) for c in v)
+                P5[key].append(v)
+
+        print_productions("5. Obtain Chomsky Normal Form(CNF):", P5)
         return P5
 
     def ReturnProductions(self):
-        print(f"Initial Grammar:")
-        for key, value in self.P.items():
-            print(f"{key} -> {' | '.join(value)}")
-        print("------------------------------------------------")
+        print_productions("Initial Grammar:", self.P)
         P1 = self.elim_epsilon()
         P2 = self.elim_unit_prod()
         P3 = self.elim_inaccesible_symb()
@@ -156,6 +167,49 @@ class Grammar:
         P5 = self.transf_to_cnf()
         return P1, P2, P3, P4, P5
 
+
+class IndexedRules:
+    # Productions as a flat list of rules, and for each non-terminal the rules whose body contains
+    # it, once per occurrence
+    def __init__(self, productions, non_terminals):
+        self.heads = []
+        self.bodies = []
+        self.occurrences = {symbol: [] for symbol in non_terminals}
+        for head, bodies in productions.items():
+            for body in bodies:
+                rule = len(self.bodies)
+                self.heads.append(head)
+                self.bodies.append(body)
+                if body != EPSILON:
+                    for symbol in body:
+                        if symbol in self.occurrences:
+                            self.occurrences[symbol].append(rule)
+
+    def fixpoint(self, pending):
+        # Heads of the rules whose pending count reaches 0. Each head found takes one off the count
+        # of every rule it occurs in, so every occurrence is visited at most once.
+        found = set()
+        worklist = []
+        for rule, count in enumerate(pending):
+            if count == 0 and self.heads[rule] not in found:
+                found.add(self.heads[rule])
+                worklist.append(self.heads[rule])
+        while worklist:
+            for rule in self.occurrences.get(worklist.pop(), ()):
+                pending[rule] -= 1
+                if pending[rule] == 0 and self.heads[rule] not in found:
+                    found.add(self.heads[rule])
+                    worklist.append(self.heads[rule])
+        return found
+
+
+def print_productions(title, P):
+    print(title)
+    for key, value in P.items():
+        print(f"{key} -> {' | '.join(value)}")
+    print("------------------------------------------------")
+
+
 if __name__ == "__main__":
     g = Grammar()
-    P1, P2, P3, P4, P5 = g.ReturnProductions()
\ No newline at end of file
+    P1, P2, P3, P4, P5 = g.ReturnProductions()
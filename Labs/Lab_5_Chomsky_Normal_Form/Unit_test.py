@@ -8,55 +8,104 @@ class TestGrammar(unittest.TestCase):
         self.P1, self.P2, self.P3, self.P4, self.P5 = self.g.ReturnProductions()
 
     def test_elim_epsilon(self):
-        expected_result = {'S': ['dB', 'd', 'dS', 'aBdB'],
-                           'A': ['d', 'dS', 'aBdB'],
-                           'B': ['a', 'aS', 'AC', 'd', 'dS', 'aBdB'],
+        expected_result = {'S': ['dB', 'A'],
+                           'A': ['d', 'dS', 'EF'],
+                           'B': ['a', 'aS', 'AC', 'A'],
                            'D': ['AB'],
-                           'C': ['bC', 'b']
+                           'C': ['bC', 'b'],
+                           'E': ['aB'],
+                           'F': ['dB']
                            }
         self.assertEqual(self.P1, expected_result)
 
     def test_elim_unit_prod(self):
-        expected_result = {'S': ['dB', 'd', 'dS', 'aBdB'],
-                           'A': ['d', 'dS', 'aBdB'],
-                           'B': ['a', 'aS', 'AC', 'd', 'dS', 'aBdB'],
+        expected_result = {'S': ['dB', 'd', 'dS', 'EF'],
+                           'A': ['d', 'dS', 'EF'],
+                           'B': ['a', 'aS', 'AC', 'd', 'dS', 'EF'],
                            'D': ['AB'],
-                           'C': ['bC', 'b']
+                           'C': ['bC', 'b'],
+                           'E': ['aB'],
+                           'F': ['dB']
                            }
         self.assertEqual(self.P2, expected_result)
 
     def test_elim_inaccesible_sumb(self):
-        expected_result = {'S': ['dB', 'd', 'dS', 'aBdB'],
-                           'A': ['d', 'dS', 'aBdB'],
-                           'B': ['a', 'aS', 'AC', 'd', 'dS', 'aBdB'],
-                           'C': ['bC', 'b']
+        expected_result = {'S': ['dB', 'd', 'dS', 'EF'],
+                           'A': ['d', 'dS', 'EF'],
+                           'B': ['a', 'aS', 'AC', 'd', 'dS', 'EF'],
+                           'C': ['bC', 'b'],
+                           'E': ['aB'],
+                           'F': ['dB']
                            }
         self.assertEqual(self.P3, expected_result)
 
     def test_elim_unprod_symb(self):
-        expected_result = {'S': ['dB', 'd', 'dS', 'aBdB'],
-                           'A': ['d', 'dS', 'aBdB'],
-                           'B': ['a', 'aS', 'AC', 'd', 'dS', 'aBdB'],
-                           'C': ['bC', 'b']
+        expected_result = {'S': ['dB', 'd', 'dS', 'EF'],
+                           'A': ['d', 'dS', 'EF'],
+                           'B': ['a', 'aS', 'AC', 'd', 'dS', 'EF'],
+                           'C': ['bC', 'b'],
+                           'E': ['aB'],
+                           'F': ['dB']
                            }
         self.assertEqual(self.P4, expected_result)
 
     def test_transform_to_cnf(self):
-        expected_result = {'S': ['DE', 'd', 'DF', 'GH'],
-                           'A': ['d', 'DF', 'GH'],
-                           'B': ['a', 'IF', 'AC', 'd', 'DF', 'GH'],
-                           'C': ['JK', 'b'],
-                           'D': ['d'],
-                           'E': ['B'],
-                           'F': ['S'],
-                           'G': ['aB'],
-                           'H': ['dB'],
-                           'I': ['a'],
-                           'J': ['b'],
-                           'K': ['C']
+        expected_result = {'S': ['GB', 'd', 'GS', 'EF'],
+                           'A': ['d', 'GS', 'EF'],
+                           'B': ['a', 'HS', 'AC', 'd', 'GS', 'EF'],
+                           'C': ['IC', 'b'],
+                           'E': ['HB'],
+                           'F': ['GB'],
+                           'G': ['d'],
+                           'H': ['a'],
+                           'I': ['b']
                            }
         self.assertEqual(self.P5, expected_result)
 
 
+class TestGrammarSteps(unittest.TestCase):
+    def grammar(self, P, V_N, V_T):
+        g = Grammar()
+        g.P, g.V_N, g.V_T = P, V_N, V_T
+        return g
+
+    def test_elim_epsilon_every_occurrence(self):
+        g = self.grammar({'S': ['AbA'], 'A': ['a', 'epsilon']}, ['S', 'A'], ['a', 'b'])
+        self.assertEqual(g.elim_epsilon(), {'S': ['AB', 'B'], 'A': ['a'], 'B': ['bA', 'b']})
+
+    def test_elim_epsilon_nullable_through_rules(self):
+        g = self.grammar({'S': ['aAB'], 'A': ['BB'], 'B': ['epsilon']}, ['S', 'A', 'B'], ['a'])
+        self.assertEqual(g.nullable_symbols(), {'A', 'B'})
+        self.assertEqual(g.elim_epsilon(), {'S': ['aC', 'a'], 'A': ['BB', 'B'], 'C': ['AB', 'B', 'A']})
+
+    def test_elim_epsilon_long_nullable_body(self):
+        symbols = 'ABCDEFGHIJKLMNOPQRTU'
+        P = {'S': [symbols]}
+        P.update({symbol: [symbol.lower(), 'epsilon'] for symbol in symbols})
+        g = self.grammar(P, ['S'] + list(symbols), list(symbols.lower()))
+        P1 = g.elim_epsilon()
+        self.assertTrue(all(len(v) <= 2 for value in P1.values() for v in value))
+        self.assertLessEqual(sum(len(value) for value in P1.values()), 3 * len(P1))
+
+    def test_elim_unit_chain(self):
+        g = self.grammar({'S': ['A'], 'A': ['B'], 'B': ['C', 'b'], 'C': ['c', 'S']}, ['S', 'A', 'B', 'C'], ['b', 'c'])
+        self.assertEqual(g.elim_unit_prod(), {'S': ['b', 'c'], 'A': ['b', 'c'], 'B': ['b', 'c'], 'C': ['c', 'b']})
+
+    def test_elim_inaccesible_from_start(self):
+        g = self.grammar({'S': ['aA'], 'A': ['a'], 'B': ['aC'], 'C': ['b']}, ['S', 'A', 'B', 'C'], ['a', 'b'])
+        self.assertEqual(g.elim_inaccesible_symb(), {'S': ['aA'], 'A': ['a']})
+        self.assertEqual(g.V_N, ['S', 'A', 'B', 'C'])
+
+    def test_elim_unprod_through_non_terminals(self):
+        g = self.grammar({'S': ['AB', 'aC'], 'A': ['BB'], 'B': ['b'], 'C': ['aC']}, ['S', 'A', 'B', 'C'], ['a', 'b'])
+        self.assertEqual(g.elin_unnprod_symb(), {'S': ['AB'], 'A': ['BB'], 'B': ['b']})
+
+    def test_transform_to_cnf_long_body(self):
+        g = self.grammar({'S': ['aSbSc', 'd']}, ['S'], ['a', 'b', 'c', 'd'])
+        P5 = g.ReturnProductions()[4]
+        self.assertEqual(P5, {'S': ['AB', 'd'], 'A': ['DS'], 'B': ['FC'], 'C': ['SE'], 'D': ['a'], 'E': ['c'],
+                              'F': ['b']})
+
+
 if __name__ == '__main__':
     unittest.main()